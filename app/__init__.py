@@ -22,6 +22,50 @@ def create_app(config_name=None):
     login_manager.init_app(app)
     csrf.init_app(app)
     
+    # Apply SQLite pragmas (WAL, busy_timeout, ...) on every new connection
+    from app.utils import sqlite_tuning
+    sqlite_tuning.init_app(app)
+    
+    # Configure the cached public IP lookup
+    from app.utils.public_ip import public_ip_resolver
+    public_ip_resolver.init_app(app)
+    
+    # Batch ServiceStatus/SystemMetrics writes off the request path
+    from app.utils.write_behind import write_behind
+    write_behind.init_app(app)
+    
+    # Configure the service status cache
+    from app.utils.service_cache import service_status_cache
+    service_status_cache.init_app(app)
+    
+    # Thread pool for bulk service actions
+    from app.utils.service_jobs import service_job_manager
+    service_job_manager.init_app(app)
+    
+    # Next-poll hints for polling clients (before the ETag layer, to see its 304s)
+    from app.utils.poll_hints import poll_advisor
+    poll_advisor.init_app(app)
+    
+    # Compression, ETags and long-lived caching of fingerprinted static files
+    from app.utils.responses import response_layer
+    response_layer.init_app(app)
+    
+    # Background-computed, persisted sizes for the SMB browser
+    from app.utils.directory_index import directory_size_index
+    directory_size_index.init_app(app)
+    
+    # Thread pool that loads dashboard panels under a deadline
+    from app.utils.panels import panel_collector
+    panel_collector.init_app(app)
+    
+    # Push new chat messages to Server-Sent Events subscribers
+    from app.utils.chat_hub import chat_hub
+    chat_hub.init_app(app)
+    
+    # Start the background system metrics sampler
+    from app.utils.collector import collector
+    collector.init_app(app)
+    
     # Configure login manager
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
@@ -42,9 +86,12 @@ def create_app(config_name=None):
     app.register_blueprint(api_bp, url_prefix='/api')
     app.register_blueprint(admin_bp, url_prefix='/admin')
     
-    # Create database tables
+    # Create database tables and bring existing ones up to date
+    from app import migrations
+    migrations.init_app(app)
     with app.app_context():
         db.create_all()
+        migrations.upgrade()
         
         # Create default admin user if not exists
         from app.models import User
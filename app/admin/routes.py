@@ -1,5 +1,6 @@
 from flask import render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
 from app.admin import bp
 from app.models import User, AuditLog, ServiceStatus
 from app.forms import RegistrationForm, UserEditForm, ServiceControlForm
@@ -9,9 +10,13 @@ import string
 
 try:
     from app.utils.system_info import control_service
+    from app.utils.service_cache import invalidate_service_statuses
 except ImportError:
     def control_service(service, action):
         return {'success': False, 'error': 'Service control not available'}
+    
+    def invalidate_service_statuses(services=None):
+        pass
 
 def admin_required(f):
     def decorated_function(*args, **kwargs):
@@ -156,6 +161,7 @@ def control_service_route():
         
         try:
             result = control_service(service_name, action)
+            invalidate_service_statuses([service_name])
             
             # Log service control
             audit_log = AuditLog(
@@ -183,7 +189,8 @@ def control_service_route():
 @admin_required
 def audit_logs():
     page = request.args.get('page', 1, type=int)
-    logs = AuditLog.query.order_by(AuditLog.timestamp.desc()).paginate(
+    # Load each row's user in the same query; the template shows its name
+    logs = AuditLog.query.options(joinedload(AuditLog.user)).order_by(AuditLog.timestamp.desc()).paginate(
         page=page, per_page=50, error_out=False)
     return render_template('admin/audit_logs.html', logs=logs)
 
@@ -1,12 +1,30 @@
-from flask import jsonify, request
+from flask import Response, current_app, jsonify, request, stream_with_context, url_for
 from flask_login import login_required, current_user
-from app.api import bp
-from app.models import ChatMessage, SystemMetrics, ServiceStatus, User
+from sqlalchemy.orm import joinedload
 from app import db
-from datetime import datetime, timedelta
+from app.api import bp
+from app.models import ChatMessage, SystemMetrics, User
+from app.utils.chat_hub import StreamLimitReached, chat_hub
+from app.utils.chat_history import chat_page
+from app.utils.downsample import downsample_columns
+from app.utils.live_stream import live_events
+from app.utils.metrics_export import EXPORT_FORMATS, EXPORT_MIMETYPES, iter_columnar, iter_csv, iter_ndjson
+from app.utils.metrics_stats import DEFAULT_THRESHOLDS, metrics_stats
+from app.utils.panels import panel_collector
+from app.utils.poll_hints import poll_hint
+from app.utils.rollups import (EPOCH, choose_history_source, history_query, history_snapshot,
+                               iter_history_column, load_history_columns, snapshot_blocks_writers,
+                               source_resolution)
+from app.utils.write_behind import write_behind
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta, timezone
 
 try:
-    from app.utils.system_info import get_system_info, get_service_status
+    from app.utils.system_info import get_system_info, resolve_system_info_fields
+    from app.utils.collector import get_system_snapshot
+    from app.utils.service_cache import get_cached_service_statuses
+    from app.utils.service_jobs import service_job_manager
+    from app.utils.file_manager import get_smb_files
 except ImportError:
     # Fallback functions if utils are not available
     def get_system_info():
@@ -20,73 +38,376 @@ except ImportError:
             'hostname': 'Unknown'
         }
     
-    def get_service_status(service):
-        return 'unknown'
+    def get_system_snapshot(fields=None):
+        return get_system_info()
+    
+    def resolve_system_info_fields(fields=None, profile=None):
+        return None
+    
+    def get_cached_service_statuses(services, max_age=None):
+        checked_at = datetime.utcnow()
+        return {
+            service: {'status': 'unknown', 'checked_at': checked_at.timestamp(), 'last_checked': checked_at.isoformat()}
+            for service in services
+        }
+    
+    service_job_manager = None
+    
+    def get_smb_files(path):
+        return []
+
+# Snapshot keys that change on every sample, and the response headers that carry them
+VOLATILE_SYSTEM_FIELDS = {
+    'sampled_at': 'X-Snapshot-Sampled-At',
+    'snapshot_age': 'X-Snapshot-Age'
+}
+
+def snapshot_headers(snapshot):
+    """Move the volatile keys out of ``snapshot`` into response headers
+
+    In the body they would change the ETag of every response.
+    """
+    return {
+        header: str(snapshot.pop(field))
+        for field, header in VOLATILE_SYSTEM_FIELDS.items() if field in snapshot
+    }
 
 @bp.route('/system_info')
 @login_required
+@poll_hint('METRICS_SAMPLE_INTERVAL')
 def system_info():
-    """Get current system information"""
-    info = get_system_info()
-    
-    # Store metrics in database
-    metrics = SystemMetrics(
-        cpu_percent=info['cpu_percent'],
-        memory_percent=info['memory_percent'],
-        disk_percent=info['disk_percent'],
-        network_bytes_sent=info.get('network_bytes_sent', 0),
-        network_bytes_recv=info.get('network_bytes_recv', 0),
-        load_average=info.get('load_average', '')
-    )
-    db.session.add(metrics)
-    db.session.commit()
-    
-    return jsonify(info)
+    """Get current system information
+
+    ``?fields=cpu_percent,uptime`` or ``?profile=dashboard`` limits the
+    response to those fields. When and how long ago the snapshot was sampled
+    are sent as ``X-Snapshot-Sampled-At`` and ``X-Snapshot-Age``.
+    """
+    try:
+        fields = resolve_system_info_fields(request.args.get('fields'), request.args.get('profile'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    info = get_system_snapshot(fields)
+    headers = snapshot_headers(info)
+    return jsonify(info), headers
+
+CHAT_RECENT_LIMIT = 20
+CHAT_AFTER_LIMIT = 100
+
+def chat_etag():
+    """Version of the chat: changes when a message is added or deleted"""
+    last_id, count = db.session.query(db.func.max(ChatMessage.id), db.func.count(ChatMessage.id)).one()
+    return f'chat-{last_id or 0}-{count}'
 
 @bp.route('/chat_messages')
 @login_required
+@poll_hint('CHAT_POLL_INTERVAL')
 def chat_messages():
-    """Get recent chat messages"""
-    messages = ChatMessage.query.order_by(ChatMessage.timestamp.desc()).limit(20).all()
-    return jsonify([msg.to_dict() for msg in reversed(messages)])
+    """Get recent chat messages, oldest first
+
+    ``?after_id=`` returns only messages newer than that id (at most
+    ``CHAT_AFTER_LIMIT``); ``X-Chat-Has-More`` tells whether newer ones are
+    left. Otherwise the newest ``?limit=`` messages are returned, older than
+    ``?before_id=`` when given; ``X-Chat-Has-More`` tells whether older ones
+    exist. Responses carry an ETag, and a poll whose ``If-None-Match`` still
+    matches gets an empty 304 before any message is loaded. A truncated
+    ``after_id`` page gets no ETag: it does not bring the client up to that
+    version of the chat.
+    """
+    etag = chat_etag()
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        after_id = request.args.get('after_id', type=int)
+        if after_id is not None:
+            messages = ChatMessage.query.options(joinedload(ChatMessage.author)) \
+                .filter(ChatMessage.id > after_id).order_by(ChatMessage.id.asc()).limit(CHAT_AFTER_LIMIT + 1).all()
+            has_more = len(messages) > CHAT_AFTER_LIMIT
+            messages = messages[:CHAT_AFTER_LIMIT]
+        else:
+            messages, has_more = chat_page(request.args.get('before_id', type=int),
+                                           request.args.get('limit', CHAT_RECENT_LIMIT, type=int))
+        response = jsonify([msg.to_dict() for msg in messages])
+        response.headers['X-Chat-Has-More'] = 'true' if has_more else 'false'
+        if after_id is not None and has_more:
+            etag = None
+    
+    if etag is not None:
+        response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def streams_exhausted():
+    """Refuse a stream: EventSource gives up on a 503 and the page polls instead"""
+    response = jsonify({'error': 'Too many open streams, poll instead'})
+    response.status_code = 503
+    return response
+
+@bp.route('/chat/stream')
+@login_required
+def chat_stream():
+    """Server-Sent Events stream of new chat messages
+
+    Resumes after the ``Last-Event-ID`` header sent by a reconnecting
+    EventSource, or after ``?after_id=`` on the first connection. A 503
+    means this worker has no stream slot left and the page should poll.
+    """
+    after_id = request.headers.get('Last-Event-ID', type=int)
+    if after_id is None:
+        after_id = request.args.get('after_id', type=int)
+    
+    try:
+        subscriber, missed = chat_hub.subscribe(after_id)
+    except StreamLimitReached:
+        return streams_exhausted()
+    response = Response(chat_hub.events(subscriber, missed, after_id), mimetype='text/event-stream')
+    response.call_on_close(lambda: chat_hub.unsubscribe(subscriber))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # keep reverse proxies from buffering events
+    return response
+
+def record_service_statuses(statuses):
+    """Queue probe results for the write-behind ServiceStatus writer"""
+    for name, details in statuses.items():
+        write_behind.record_service_status(
+            name, details['status'], datetime.utcfromtimestamp(details['checked_at']))
 
 @bp.route('/service_status/<service_name>')
 @login_required
+@poll_hint('SERVICE_STATUS_TTL')
 def service_status(service_name):
-    """Get status of a specific service"""
-    status = get_service_status(service_name)
+    """Get status of a specific service
+
+    Served from a short-lived cache; ``?max_age=0`` forces a fresh probe.
+    """
+    max_age = request.args.get('max_age', type=float)
+    statuses = get_cached_service_statuses([service_name], max_age)
     
     # Update database
-    service = ServiceStatus.query.filter_by(service_name=service_name).first()
-    if not service:
-        service = ServiceStatus(service_name=service_name)
-        db.session.add(service)
-    
-    service.status = status
-    service.last_checked = datetime.utcnow()
-    db.session.commit()
+    record_service_statuses(statuses)
     
+    details = statuses[service_name]
     return jsonify({
         'service': service_name,
-        'status': status,
-        'last_checked': service.last_checked.isoformat()
+        'status': details['status'],
+        'last_checked': details['last_checked']
+    })
+
+@bp.route('/service_status')
+@login_required
+@poll_hint('SERVICE_STATUS_TTL')
+def service_statuses():
+    """Get status of several services (``?names=a,b,c``) with one systemctl call"""
+    names = [name.strip() for name in request.args.get('names', '').split(',') if name.strip()]
+    if not names:
+        return jsonify({'error': 'No service names given'}), 400
+    
+    max_age = request.args.get('max_age', type=float)
+    statuses = get_cached_service_statuses(names, max_age)
+    
+    # Update database
+    record_service_statuses(statuses)
+    
+    return jsonify({
+        'services': {
+            name: {key: value for key, value in details.items() if key != 'checked_at'}
+            for name, details in statuses.items()
+        },
+        'last_checked': max(details['last_checked'] for details in statuses.values())
     })
 
+@bp.route('/services/jobs', methods=['POST'])
+@login_required
+def create_service_job():
+    """Start a bulk service action and return its job id immediately
+
+    JSON body: ``{"action": "restart", "services": ["nginx", "squid"]}``,
+    optionally with ``"sequential": true`` or explicit ``"stages": [[...], [...]]``
+    for dependency order.
+    """
+    if not current_user.is_admin():
+        return jsonify({'error': 'Access denied'}), 403
+    
+    if service_job_manager is None:
+        return jsonify({'error': 'Service control not available'}), 503
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        job_id = service_job_manager.submit(
+            data.get('action'),
+            services=data.get('services'),
+            stages=data.get('stages'),
+            sequential=bool(data.get('sequential')),
+            user_id=current_user.id,
+            username=current_user.username,
+            ip_address=request.remote_addr,
+            user_agent=request.headers.get('User-Agent')
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'job_id': job_id,
+        'status_url': url_for('api.service_job', job_id=job_id)
+    }), 202
+
+@bp.route('/services/jobs/<job_id>')
+@login_required
+def service_job(job_id):
+    """Get progress and per-service results of a bulk service action"""
+    if not current_user.is_admin():
+        return jsonify({'error': 'Access denied'}), 403
+    
+    job = service_job_manager.get(job_id) if service_job_manager else None
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(job.to_dict())
+
+@bp.route('/write_behind/stats')
+@login_required
+def write_behind_stats():
+    """Get queue depth and flush latency of the write-behind writer"""
+    if not current_user.is_admin():
+        return jsonify({'error': 'Access denied'}), 403
+    
+    return jsonify(write_behind.get_stats())
+
 @bp.route('/metrics/history')
 @login_required
 def metrics_history():
-    """Get historical system metrics"""
+    """Get historical system metrics
+
+    ``?hours=`` sets the range and ``?resolution=`` (seconds) the finest
+    spacing wanted; the response header ``X-Metrics-Resolution`` tells which
+    resolution was served. ``?points=N`` (at least 3) downsamples to about N
+    points with LTTB, keeping the shape of ``?series=`` (default
+    ``cpu_percent``).
+    ``?format=`` is ``json`` (default), or one of the streamed layouts
+    ``ndjson``, ``csv`` and ``columnar`` (an array per column with
+    delta-encoded timestamps ``t``).
+    """
     if not current_user.is_admin():
         return jsonify({'error': 'Access denied'}), 403
     
     hours = request.args.get('hours', 24, type=int)
+    resolution = request.args.get('resolution', type=int)
+    series = request.args.get('series', 'cpu_percent')
     since = datetime.utcnow() - timedelta(hours=hours)
     
-    metrics = SystemMetrics.query.filter(
-        SystemMetrics.timestamp >= since
-    ).order_by(SystemMetrics.timestamp.asc()).all()
+    export_format = request.args.get('format', 'json')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unknown format: {export_format}'}), 400
+    
+    # Serve from the coarsest rollup tier that still gives the wanted resolution
+    source = choose_history_source(since, resolution=resolution)
+    served_resolution = source_resolution(source)
+    
+    points = request.args.get('points', type=int)
+    if points is not None and points < 3:
+        return jsonify({'error': 'points must be at least 3'}), 400
+    if points or export_format == 'json':
+        columns = load_history_columns(since, source)
+        if points:
+            if series not in columns:
+                return jsonify({'error': f'Unknown series: {series}'}), 400
+            columns['epoch'] = [(timestamp - EPOCH).total_seconds() for timestamp in columns['timestamp']]
+            columns = downsample_columns(columns, 'epoch', series, points)
+            del columns['epoch']
+        names = list(columns)
+        rows = zip(*columns.values())
+        column = columns.__getitem__
+    else:
+        # Stream straight from the cursor
+        names, query = history_query(since, source)
+        rows = query.yield_per(1000)
+    
+    if export_format == 'json':
+        columns['timestamp'] = [timestamp.isoformat() for timestamp in columns['timestamp']]
+        response = jsonify([dict(zip(names, values)) for values in zip(*columns.values())])
+    else:
+        if export_format == 'columnar' and points:
+            chunks = iter_columnar(names, column, served_resolution)
+        elif export_format == 'columnar':
+            chunks = iter_columnar_snapshot(names, since, source, served_resolution)
+        elif export_format == 'csv':
+            chunks = iter_csv(names, rows)
+        else:
+            chunks = iter_ndjson(names, rows)
+        response = Response(stream_with_context(chunks), mimetype=EXPORT_MIMETYPES[export_format])
+        if export_format == 'csv':
+            response.headers['Content-Disposition'] = 'attachment; filename=metrics-history.csv'
+    
+    response.headers['X-Metrics-Resolution'] = str(served_resolution)
+    return response
+
+def iter_columnar_snapshot(names, since, source, resolution):
+    """Columnar export whose columns all come from one state of the tables
+
+    Late bucket inserts and in-place rollup updates would otherwise let the
+    arrays differ in length or values. Each column is streamed in its own
+    pass over one snapshot. Where an open snapshot would hold off the
+    write-behind writer for as long as the client takes to read (SQLite
+    outside WAL mode), the rows are loaded with a single query first and
+    only the encoding is streamed.
+    """
+    if snapshot_blocks_writers():
+        columns = load_history_columns(since, source)
+        yield from iter_columnar(names, columns.__getitem__, resolution)
+        return
+
+    with history_snapshot() as connection:
+        yield from iter_columnar(
+            names, lambda name: iter_history_column(connection, since, source, name), resolution)
+
+@bp.route('/metrics/latest')
+@login_required
+@poll_hint('METRICS_BUCKET_SECONDS')
+def metrics_latest():
+    """Timestamp of the newest stored sample, for pages that reload when it changes"""
+    if not current_user.is_admin():
+        return jsonify({'error': 'Access denied'}), 403
     
-    return jsonify([metric.to_dict() for metric in metrics])
+    latest = db.session.query(db.func.max(SystemMetrics.timestamp)).scalar()
+    return jsonify({'timestamp': latest.isoformat() if latest else None})
+
+def parse_utc(value):
+    """Parse an ISO timestamp into a naive UTC datetime"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+@bp.route('/metrics/stats')
+@login_required
+def metrics_stats_api():
+    """Aggregate statistics (min/max/avg, p50/p95/p99, time above threshold)
+
+    The window is ``?hours=`` (default 24) back from now, or ``?start=`` and
+    ``?end=`` as ISO timestamps (UTC). ``?cpu_threshold=``,
+    ``?memory_threshold=`` and ``?disk_threshold=`` override the thresholds.
+    """
+    if not current_user.is_admin():
+        return jsonify({'error': 'Access denied'}), 403
+    
+    try:
+        start = request.args.get('start')
+        end = request.args.get('end')
+        until = parse_utc(end) if end else datetime.utcnow()
+        if start:
+            since = parse_utc(start)
+        else:
+            since = until - timedelta(hours=request.args.get('hours', 24, type=float))
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO timestamps'}), 400
+    
+    thresholds = {}
+    for prefix in DEFAULT_THRESHOLDS:
+        threshold = request.args.get(f'{prefix}_threshold', type=float)
+        if threshold is not None:
+            thresholds[prefix] = threshold
+    
+    return jsonify(metrics_stats(since, until, thresholds))
 
 @bp.route('/user_activity')
 @login_required
@@ -103,7 +424,8 @@ def user_activity():
     total_users = User.query.count()
     
     # Recent audit logs
-    recent_logs = AuditLog.query.order_by(AuditLog.timestamp.desc()).limit(10).all()
+    recent_logs = AuditLog.query.options(joinedload(AuditLog.user)) \
+        .order_by(AuditLog.timestamp.desc()).limit(10).all()
     
     return jsonify({
         'active_users': active_users,
@@ -111,16 +433,116 @@ def user_activity():
         'recent_activity': [log.to_dict() for log in recent_logs]
     })
 
+DASHBOARD_SERVICES = {
+    'openvpn_status': 'openvpn',
+    'squid_status': 'squid'
+}
+
+DASHBOARD_STATS = {
+    'chat_message_count': lambda: ChatMessage.query.count(),
+    'user_count': lambda: User.query.count() if current_user.is_admin() else None
+}
+
 @bp.route('/dashboard_stats')
 @login_required
+@poll_hint('METRICS_SAMPLE_INTERVAL')
 def dashboard_stats():
-    """Get dashboard statistics"""
-    stats = {
-        'system_info': get_system_info(),
-        'openvpn_status': get_service_status('openvpn'),
-        'squid_status': get_service_status('squid'),
-        'chat_message_count': ChatMessage.query.count(),
-        'user_count': User.query.count() if current_user.is_admin() else None
-    }
+    """Get dashboard statistics
+
+    ``?fields=`` may name top-level stats (e.g. ``squid_status``) as well as
+    system info fields; ``?profile=`` selects a system info profile. Stats
+    that are not requested are not computed. The sample time and age of the
+    system info are sent as headers, like ``/system_info``.
+    """
+    known_stats = list(DASHBOARD_SERVICES) + list(DASHBOARD_STATS)
+    requested = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()]
+    stat_names = [name for name in requested if name in known_stats]
+    info_fields = ','.join(name for name in requested if name not in known_stats)
+    profile = request.args.get('profile')
+    
+    try:
+        fields = resolve_system_info_fields(info_fields, profile)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    stats = {}
+    headers = {}
+    if not requested and not profile:
+        stat_names = known_stats
+        stats['system_info'] = get_system_snapshot()
+    elif fields:
+        stats['system_info'] = get_system_snapshot(fields)
+    if 'system_info' in stats:
+        headers = snapshot_headers(stats['system_info'])
+    
+    # All requested services are queried with a single systemctl call
+    services = [DASHBOARD_SERVICES[name] for name in stat_names if name in DASHBOARD_SERVICES]
+    statuses = get_cached_service_statuses(services) if services else {}
+    
+    for name in stat_names:
+        if name in DASHBOARD_SERVICES:
+            stats[name] = statuses[DASHBOARD_SERVICES[name]]['status']
+        else:
+            stats[name] = DASHBOARD_STATS[name]()
     
-    return jsonify(stats)
+    return jsonify(stats), headers
+
+@bp.route('/smb_files')
+@login_required
+def smb_files():
+    """List the top level of the SMB share
+
+    Fills in the dashboard panel when it missed the page deadline; joins a
+    listing that is still running instead of starting another one. A
+    listing that takes longer than ``PANEL_API_TIMEOUT`` is answered with an
+    error entry and left running.
+    """
+    future = panel_collector.submit(get_smb_files, current_app.config['BASE_SMB_PATH'])
+    try:
+        files = future.result(timeout=panel_collector.api_timeout)
+    except FutureTimeoutError:
+        files = [{'name': 'SMB share did not respond in time', 'type': 'error', 'path': ''}]
+    return jsonify(files)
+
+@bp.route('/stream')
+@login_required
+def dashboard_stream():
+    """Server-Sent Events stream with everything the dashboard refreshes
+
+    ``system`` events carry the changed fields of the dashboard system info
+    profile, ``services`` events the changed dashboard service states, and
+    ``chat`` events new chat messages. Chat resumes like ``/chat/stream``,
+    after ``Last-Event-ID`` or ``?after_id=``, and gets the same 503 when
+    the worker's stream slots are taken.
+    """
+    after_id = request.headers.get('Last-Event-ID', type=int)
+    if after_id is None:
+        after_id = request.args.get('after_id', type=int)
+    
+    fields = resolve_system_info_fields(profile='dashboard')
+    services = list(DASHBOARD_SERVICES.values())
+    
+    def system_state():
+        snapshot = get_system_snapshot(fields)
+        return {key: value for key, value in snapshot.items() if key not in VOLATILE_SYSTEM_FIELDS}
+    
+    def service_states():
+        statuses = get_cached_service_statuses(services)
+        record_service_statuses(statuses)
+        return {name: details['status'] for name, details in statuses.items()}
+    
+    sources = {
+        'system': (current_app.config.get('DASHBOARD_STREAM_SYSTEM_INTERVAL', 5), system_state),
+        'services': (current_app.config.get('DASHBOARD_STREAM_SERVICE_INTERVAL', 10), service_states)
+    }
+    try:
+        subscriber, missed = chat_hub.subscribe(after_id)
+    except StreamLimitReached:
+        return streams_exhausted()
+    events = live_events(subscriber, missed, sources, after_id,
+                         heartbeat=chat_hub.heartbeat, max_duration=chat_hub.max_duration)
+    response = Response(events, mimetype='text/event-stream')
+    response.call_on_close(lambda: chat_hub.unsubscribe(subscriber))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
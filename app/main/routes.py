@@ -4,11 +4,18 @@ from app.main import bp
 from app.models import User, ChatMessage, AuditLog, SystemMetrics
 from app.forms import EditProfileForm, ChatMessageForm, CommandForm, ServiceControlForm
 from app import db
+from app.utils.chat_history import CHAT_PAGE_SIZE, chat_page
+from app.utils.panels import panel_collector
+from datetime import datetime, timedelta
 import subprocess
 import os
 
 try:
-    from app.utils.system_info import get_system_info, get_service_status
+    from app.utils.system_info import get_system_info
+    from app.utils.service_cache import get_cached_service_statuses, invalidate_service_statuses
+    from app.utils.collector import get_system_snapshot
+    from app.utils.metrics_stats import metrics_stats
+    from app.utils.chat_hub import notify_chat
     from app.utils.file_manager import get_smb_files, download_smb_file
 except ImportError:
     # Fallback functions if utils are not available
@@ -23,8 +30,20 @@ except ImportError:
             'hostname': 'Unknown'
         }
     
-    def get_service_status(service):
-        return 'unknown'
+    def get_system_snapshot():
+        return get_system_info()
+    
+    def get_cached_service_statuses(services, max_age=None):
+        return {service: {'status': 'unknown'} for service in services}
+    
+    def invalidate_service_statuses(services=None):
+        pass
+    
+    def metrics_stats(since, until=None, thresholds=None):
+        return None
+    
+    def notify_chat():
+        pass
     
     def get_smb_files(path):
         return []
@@ -33,30 +52,32 @@ except ImportError:
         flash('SMB functionality not available.', 'error')
         return redirect(url_for('main.index'))
 
+# Window of the performance overview on the metrics page
+METRICS_STATS_HOURS = 24
+
 @bp.route('/')
 @bp.route('/index')
 @login_required
 def index():
     # Get recent chat messages
-    chat_messages = ChatMessage.query.order_by(ChatMessage.timestamp.desc()).limit(20).all()
-    chat_messages.reverse()  # Show oldest first
+    chat_messages, _ = chat_page(limit=20)
     
-    # Get system info
-    system_info = get_system_info()
-    
-    # Get service statuses
-    openvpn_status = get_service_status('openvpn')
-    squid_status = get_service_status('squid')
-    
-    # Get SMB files
-    smb_files = get_smb_files(current_app.config['BASE_SMB_PATH'])
+    # System info, service statuses and SMB files load concurrently; any
+    # panel not ready within PANEL_TIMEOUT renders as a placeholder that the
+    # page fills in from the API
+    panels = panel_collector.collect({
+        'system_info': (get_system_snapshot,),
+        'statuses': (get_cached_service_statuses, ('openvpn', 'squid')),
+        'smb_files': (get_smb_files, current_app.config['BASE_SMB_PATH'])
+    })
+    statuses = panels['statuses'] or {}
     
     return render_template('main/dashboard.html',
                          chat_messages=chat_messages,
-                         system_info=system_info,
-                         openvpn_status=openvpn_status,
-                         squid_status=squid_status,
-                         smb_files=smb_files)
+                         system_info=panels['system_info'],
+                         openvpn_status=statuses.get('openvpn', {}).get('status'),
+                         squid_status=statuses.get('squid', {}).get('status'),
+                         smb_files=panels['smb_files'])
 
 @bp.route('/profile', methods=['GET', 'POST'])
 @login_required
@@ -111,6 +132,7 @@ def send_message():
         )
         db.session.add(message)
         db.session.commit()
+        notify_chat()
         flash('Message sent!', 'success')
     else:
         flash('Message could not be sent.', 'error')
@@ -187,9 +209,10 @@ def metrics():
         flash('Access denied. Administrator privileges required.', 'error')
         return redirect(url_for('main.index'))
     
-    # Get recent system metrics
-    metrics = SystemMetrics.query.order_by(SystemMetrics.timestamp.desc()).limit(100).all()
-    return render_template('main/metrics.html', metrics=metrics)
+    # Latest rows for the table; the overview is aggregated in SQL
+    metrics = SystemMetrics.query.order_by(SystemMetrics.timestamp.desc()).limit(20).all()
+    stats = metrics_stats(datetime.utcnow() - timedelta(hours=METRICS_STATS_HOURS))
+    return render_template('main/metrics.html', metrics=metrics, stats=stats, stats_hours=METRICS_STATS_HOURS)
 
 @bp.route('/service_control', methods=['GET', 'POST'])
 @login_required
@@ -244,6 +267,9 @@ def service_control():
         except Exception as e:
             result = f'Error: {str(e)}'
             flash(f'Error executing command: {str(e)}', 'error')
+        
+        if action != 'status':
+            invalidate_service_statuses([service_name])
     
     # Common services list
     common_services = [
@@ -259,6 +285,11 @@ def service_control():
         {'name': 'fail2ban', 'description': 'Intrusion Prevention System'}
     ]
     
+    # One systemctl call for the whole list
+    statuses = get_cached_service_statuses([service['name'] for service in common_services])
+    for service in common_services:
+        service['status'] = statuses[service['name']]['status']
+    
     return render_template('main/service_control.html', form=form, result=result, common_services=common_services)
 
 @bp.route('/terminal', methods=['GET', 'POST'])
@@ -324,10 +355,12 @@ def chat():
         )
         db.session.add(message)
         db.session.commit()
+        notify_chat()
         flash('Message sent!', 'success')
         return redirect(url_for('main.chat'))
     
-    # Get all chat messages
-    messages = ChatMessage.query.order_by(ChatMessage.timestamp.asc()).all()
+    # Only the newest page; older messages load on scroll-up (keyset on id)
+    messages, has_more = chat_page(request.args.get('before_id', type=int))
     
-    return render_template('main/chat.html', form=form, messages=messages)
+    return render_template('main/chat.html', form=form, messages=messages, has_more=has_more,
+                           page_size=CHAT_PAGE_SIZE)
@@ -0,0 +1,103 @@
+"""Schema migrations for existing databases
+
+``db.create_all()`` only creates missing tables, so changes to tables that
+already exist (new indexes, new columns) are added here as numbered steps.
+Applied versions are recorded in ``schema_migrations``; ``upgrade()`` runs
+the pending ones at startup or through ``flask upgrade-db``.
+"""
+from datetime import datetime
+
+import click
+from sqlalchemy import text
+
+from app import db
+
+MIGRATIONS = []
+
+
+def migration(version, name):
+    """Register ``func(connection)`` as schema step ``version``"""
+    def register(func):
+        MIGRATIONS.append((version, name, func))
+        return func
+    return register
+
+
+def create_indexes(connection, *names):
+    """Create model-declared indexes that are missing from the database"""
+    for table in db.metadata.tables.values():
+        for index in table.indexes:
+            if index.name in names:
+                index.create(connection, checkfirst=True)
+
+
+@migration(1, 'Index for the active user count')
+def add_hot_query_indexes(connection):
+    create_indexes(connection, 'ix_user_last_login')
+
+
+@migration(2, 'Unique metrics bucket timestamps')
+def unique_metrics_timestamps(connection):
+    # Keep the first row of any bucket stored twice before the index existed
+    connection.execute(text(
+        'DELETE FROM system_metrics WHERE id NOT IN '
+        '(SELECT MIN(id) FROM system_metrics GROUP BY timestamp)'
+    ))
+    connection.execute(text('DROP INDEX IF EXISTS ix_system_metrics_timestamp'))
+    create_indexes(connection, 'ix_system_metrics_timestamp')
+
+
+@migration(3, 'Backfill metrics rollups from raw samples')
+def backfill_metrics_rollups(connection):
+    from app.utils.rollups import backfill_rollups
+
+    backfill_rollups(connection)
+
+
+@migration(4, 'Drop audit log filter indexes')
+def drop_audit_log_filter_indexes(connection):
+    # Created by an earlier version of step 1 for filters the audit log does not have
+    connection.execute(text('DROP INDEX IF EXISTS ix_audit_log_user_id_timestamp'))
+    connection.execute(text('DROP INDEX IF EXISTS ix_audit_log_action_timestamp'))
+
+
+def upgrade(engine=None):
+    """Apply pending migrations and return the ``(version, name)`` pairs that ran"""
+    engine = engine or db.engine
+
+    with engine.connect() as connection:
+        if engine.dialect.name == 'sqlite':
+            # Take the write lock up front so concurrently starting workers
+            # run the migrations one after another
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+        connection.execute(text(
+            'CREATE TABLE IF NOT EXISTS schema_migrations ('
+            'version INTEGER PRIMARY KEY, name VARCHAR(200) NOT NULL, applied_at DATETIME NOT NULL)'
+        ))
+        applied = {row[0] for row in connection.execute(text('SELECT version FROM schema_migrations'))}
+
+        ran = []
+        for version, name, func in sorted(MIGRATIONS, key=lambda step: step[0]):
+            if version in applied:
+                continue
+            func(connection)
+            connection.execute(
+                text('INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :applied_at)'),
+                {'version': version, 'name': name, 'applied_at': datetime.utcnow()}
+            )
+            ran.append((version, name))
+
+        connection.commit()
+    return ran
+
+
+def init_app(app):
+    @app.cli.command('upgrade-db')
+    def upgrade_db_command():
+        """Apply pending schema migrations."""
+        ran = upgrade()
+        for version, name in ran:
+            click.echo(f'Applied migration {version}: {name}')
+        if not ran:
+            click.echo('Database schema is up to date.')
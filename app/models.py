@@ -14,7 +14,7 @@ class User(UserMixin, db.Model):
     profile_image_url = db.Column(db.String(255), default='https://placehold.co/150x150')
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    last_login = db.Column(db.DateTime)
+    last_login = db.Column(db.DateTime, index=True)
     
     # Relationships
     chat_messages = db.relationship('ChatMessage', backref='author', lazy='dynamic', cascade='all, delete-orphan')
@@ -87,7 +87,7 @@ class AuditLog(db.Model):
 
 class SystemMetrics(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, unique=True, index=True)  # one row per bucket
     cpu_percent = db.Column(db.Float)
     memory_percent = db.Column(db.Float)
     disk_percent = db.Column(db.Float)
@@ -128,3 +128,127 @@ class ServiceStatus(db.Model):
     
     def __repr__(self):
         return f'<ServiceStatus {self.service_name}: {self.status}>'
+
+class MetricsRollup(db.Model):
+    """Aggregated SystemMetrics for one time bucket at one resolution (seconds)"""
+    __table_args__ = (db.UniqueConstraint('resolution', 'bucket_start', name='uq_metrics_rollup_bucket'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    resolution = db.Column(db.Integer, nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    sample_count = db.Column(db.Integer, nullable=False, default=0)
+    last_sample_at = db.Column(db.DateTime)
+    cpu_min = db.Column(db.Float)
+    cpu_max = db.Column(db.Float)
+    cpu_sum = db.Column(db.Float)
+    cpu_last = db.Column(db.Float)
+    memory_min = db.Column(db.Float)
+    memory_max = db.Column(db.Float)
+    memory_sum = db.Column(db.Float)
+    memory_last = db.Column(db.Float)
+    disk_min = db.Column(db.Float)
+    disk_max = db.Column(db.Float)
+    disk_sum = db.Column(db.Float)
+    disk_last = db.Column(db.Float)
+    network_bytes_sent = db.Column(db.BigInteger)  # Counter value of the last sample
+    network_bytes_recv = db.Column(db.BigInteger)
+    
+    def to_dict(self):
+        count = self.sample_count or 1
+        return {
+            'timestamp': self.bucket_start.isoformat(),
+            'resolution': self.resolution,
+            'samples': self.sample_count,
+            'cpu_percent': round(self.cpu_sum / count, 2),
+            'cpu_min': self.cpu_min,
+            'cpu_max': self.cpu_max,
+            'cpu_last': self.cpu_last,
+            'memory_percent': round(self.memory_sum / count, 2),
+            'memory_min': self.memory_min,
+            'memory_max': self.memory_max,
+            'memory_last': self.memory_last,
+            'disk_percent': round(self.disk_sum / count, 2),
+            'disk_min': self.disk_min,
+            'disk_max': self.disk_max,
+            'disk_last': self.disk_last,
+            'network_bytes_sent': self.network_bytes_sent,
+            'network_bytes_recv': self.network_bytes_recv
+        }
+    
+    def __repr__(self):
+        return f'<MetricsRollup {self.resolution}s {self.bucket_start}>'
+
+class DirectorySize(db.Model):
+    """Total size of the files below a directory, valid while its mtime is unchanged"""
+    id = db.Column(db.Integer, primary_key=True)
+    path = db.Column(db.String(1024), nullable=False, unique=True)
+    mtime = db.Column(db.Float, nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<DirectorySize {self.path}: {self.size}>'
+
+class ServiceJob(db.Model):
+    """A bulk service action; every worker can report on it, the one that runs it writes it"""
+    id = db.Column(db.String(32), primary_key=True)
+    action = db.Column(db.String(20), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, completed, failed
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    finished_at = db.Column(db.DateTime)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    
+    results = db.relationship('ServiceJobResult', backref='job', order_by='ServiceJobResult.id',
+                              cascade='all, delete-orphan')
+    
+    @property
+    def finished(self):
+        return self.status in ('completed', 'failed')
+    
+    def to_dict(self):
+        stages = []
+        for result in self.results:
+            while len(stages) <= result.stage:
+                stages.append([])
+            stages[result.stage].append(result.service_name)
+        
+        done = sum(1 for result in self.results if result.state not in ('pending', 'running'))
+        return {
+            'id': self.id,
+            'action': self.action,
+            'status': self.status,
+            'stages': stages,
+            'progress': {'done': done, 'total': len(self.results)},
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'services': {result.service_name: result.to_dict() for result in self.results}
+        }
+    
+    def __repr__(self):
+        return f'<ServiceJob {self.id}: {self.action} {self.status}>'
+
+class ServiceJobResult(db.Model):
+    """Progress of one service within a ServiceJob"""
+    __table_args__ = (db.UniqueConstraint('job_id', 'service_name', name='uq_service_job_result_service'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(32), db.ForeignKey('service_job.id'), nullable=False)
+    stage = db.Column(db.Integer, nullable=False)
+    service_name = db.Column(db.String(100), nullable=False)
+    state = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, succeeded, failed, skipped
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    output = db.Column(db.Text)
+    error = db.Column(db.Text)
+    
+    def to_dict(self):
+        return {
+            'state': self.state,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'output': self.output,
+            'error': self.error
+        }
+    
+    def __repr__(self):
+        return f'<ServiceJobResult {self.job_id}/{self.service_name}: {self.state}>'
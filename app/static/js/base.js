@@ -0,0 +1,179 @@
+// Auto-hide alerts after 5 seconds
+document.addEventListener('DOMContentLoaded', function() {
+    const alerts = document.querySelectorAll('.alert');
+    alerts.forEach(function(alert) {
+        setTimeout(function() {
+            alert.style.opacity = '0';
+            setTimeout(function() {
+                alert.remove();
+            }, 300);
+        }, 5000);
+    });
+
+    // Hamburger menu functionality
+    const navbarToggle = document.getElementById('navbar-toggle');
+    const navbarNav = document.getElementById('navbar-nav');
+    const navLinks = document.querySelectorAll('.nav-link');
+    const adminDropdowns = document.querySelectorAll('.admin-dropdown');
+
+    if (navbarToggle && navbarNav) {
+        navbarToggle.addEventListener('click', function() {
+            navbarNav.classList.toggle('active');
+
+            // Change hamburger icon
+            const icon = navbarToggle.querySelector('i');
+            if (navbarNav.classList.contains('active')) {
+                icon.className = 'fas fa-times';
+            } else {
+                icon.className = 'fas fa-bars';
+            }
+        });
+
+        // Close menu when clicking on a regular link (not dropdown triggers)
+        navLinks.forEach(function(link) {
+            if (!link.closest('.admin-dropdown') || link.closest('.admin-dropdown-content')) {
+                link.addEventListener('click', function(e) {
+                    // Don't close for dropdown triggers on desktop
+                    if (window.innerWidth > 768 && link.getAttribute('href') === '#') {
+                        e.preventDefault();
+                        return;
+                    }
+
+                    navbarNav.classList.remove('active');
+                    const icon = navbarToggle.querySelector('i');
+                    icon.className = 'fas fa-bars';
+                });
+            }
+        });
+
+        // Handle dropdown click for mobile
+        adminDropdowns.forEach(function(dropdown) {
+            const trigger = dropdown.querySelector('a[href="#"]');
+            if (trigger) {
+                trigger.addEventListener('click', function(e) {
+                    if (window.innerWidth <= 768) {
+                        e.preventDefault();
+                        const content = dropdown.querySelector('.admin-dropdown-content');
+                        if (content) {
+                            content.style.display = content.style.display === 'block' ? 'none' : 'block';
+                        }
+                    }
+                });
+            }
+        });
+
+        // Close menu when clicking outside
+        document.addEventListener('click', function(event) {
+            const isClickInsideNav = navbarNav.contains(event.target);
+            const isClickOnToggle = navbarToggle.contains(event.target);
+
+            if (!isClickInsideNav && !isClickOnToggle && navbarNav.classList.contains('active')) {
+                navbarNav.classList.remove('active');
+                const icon = navbarToggle.querySelector('i');
+                icon.className = 'fas fa-bars';
+            }
+        });
+
+        // Close menu on window resize if becoming larger
+        window.addEventListener('resize', function() {
+            if (window.innerWidth > 768 && navbarNav.classList.contains('active')) {
+                navbarNav.classList.remove('active');
+                const icon = navbarToggle.querySelector('i');
+                icon.className = 'fas fa-bars';
+            }
+        });
+    }
+});
+
+// Mobile menu toggle
+document.addEventListener('DOMContentLoaded', function() {
+    const mobileMenuBtn = document.getElementById('mobileMenuBtn');
+    const mobileMenu = document.getElementById('mobileMenu');
+
+    if (mobileMenuBtn && mobileMenu) {
+        mobileMenuBtn.addEventListener('click', function() {
+            mobileMenu.classList.toggle('active');
+
+            // Toggle icon
+            const icon = mobileMenuBtn.querySelector('i');
+            if (mobileMenu.classList.contains('active')) {
+                icon.classList.remove('fa-bars');
+                icon.classList.add('fa-times');
+            } else {
+                icon.classList.remove('fa-times');
+                icon.classList.add('fa-bars');
+            }
+        });
+
+        // Close mobile menu when clicking outside
+        document.addEventListener('click', function(event) {
+            if (!mobileMenuBtn.contains(event.target) && !mobileMenu.contains(event.target)) {
+                mobileMenu.classList.remove('active');
+                const icon = mobileMenuBtn.querySelector('i');
+                icon.classList.remove('fa-times');
+                icon.classList.add('fa-bars');
+            }
+        });
+
+        // Close mobile menu on window resize if screen becomes large
+        window.addEventListener('resize', function() {
+            if (window.innerWidth >= 1024) {
+                mobileMenu.classList.remove('active');
+                const icon = mobileMenuBtn.querySelector('i');
+                icon.classList.remove('fa-times');
+                icon.classList.add('fa-bars');
+            }
+        });
+    }
+});
+
+// Poll at the interval the server suggests in X-Poll-Interval, back off
+// exponentially while requests fail and pause while the page is hidden.
+// poll() must return a fetch() promise; interval is the fallback in seconds.
+function startPolling(poll, interval, maxInterval = 300) {
+    let timer = null;
+    let inFlight = false;
+    let failures = 0;
+
+    function schedule(seconds) {
+        if (!document.hidden) {
+            timer = setTimeout(run, seconds * 1000);
+        }
+    }
+
+    function run() {
+        timer = null;
+        inFlight = true;
+        poll()
+            .then(response => {
+                if (!response.ok && response.status !== 304) {
+                    throw new Error(`HTTP ${response.status}`);
+                }
+                failures = 0;
+                const hint = Number(response.headers.get('X-Poll-Interval'));
+                if (hint > 0) {
+                    interval = hint;
+                }
+                return interval;
+            })
+            .catch(error => {
+                failures += 1;
+                console.error('Polling failed:', error);
+                return Math.min(interval * 2 ** failures, maxInterval);
+            })
+            .then(seconds => {
+                inFlight = false;
+                schedule(seconds);
+            });
+    }
+
+    document.addEventListener('visibilitychange', function() {
+        if (document.hidden) {
+            clearTimeout(timer);
+            timer = null;
+        } else if (timer === null && !inFlight) {
+            run();
+        }
+    });
+    run();
+}
@@ -0,0 +1,24 @@
+from sqlalchemy.orm import joinedload
+
+from app.models import ChatMessage
+
+CHAT_PAGE_SIZE = 50
+CHAT_MAX_PAGE_SIZE = 100
+
+
+def chat_page(before_id=None, limit=CHAT_PAGE_SIZE):
+    """Newest ``limit`` messages older than ``before_id`` (keyset on the id), oldest first
+
+    The cost depends only on ``limit``, not on how far back the page is.
+    Returns ``(messages, has_more)``.
+    """
+    limit = max(1, min(limit, CHAT_MAX_PAGE_SIZE))
+    query = ChatMessage.query.options(joinedload(ChatMessage.author))
+    if before_id is not None:
+        query = query.filter(ChatMessage.id < before_id)
+
+    messages = query.order_by(ChatMessage.id.desc()).limit(limit + 1).all()
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    messages.reverse()
+    return messages, has_more
@@ -0,0 +1,197 @@
+import json
+import queue
+import threading
+import time
+from collections import deque
+
+
+class StreamLimitReached(Exception):
+    """This worker already holds ``max_subscribers`` open streams"""
+
+
+class ChatHub:
+    """Fans new chat messages out to Server-Sent Events subscribers.
+
+    While anyone is subscribed, one thread per worker checks the newest
+    ``ChatMessage`` id every ``poll_interval`` seconds, loads new messages
+    once and puts them on every subscriber's queue. Polling the database is
+    what lets messages written by other gunicorn workers through;
+    ``notify()`` wakes the thread right away for messages written by this
+    worker. The last ``backlog`` messages stay in memory so reconnecting
+    clients resume from ``Last-Event-ID`` without a query of their own.
+
+    Every open stream holds a request thread for up to ``max_duration``, so
+    a worker accepts at most ``max_subscribers`` of them and leaves its
+    other threads to ordinary requests; pages told no fall back to polling.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.poll_interval = 1.0
+        self.heartbeat = 15
+        self.max_duration = 300
+        self.backlog = 200
+        self.max_subscribers = 4
+        self._recent = deque(maxlen=self.backlog)
+        self._floor = None  # every message with a higher id is in _recent
+        self._last_id = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.poll_interval = app.config.get('CHAT_STREAM_POLL_INTERVAL', self.poll_interval)
+        self.heartbeat = app.config.get('CHAT_STREAM_HEARTBEAT', self.heartbeat)
+        self.max_duration = app.config.get('CHAT_STREAM_MAX_DURATION', self.max_duration)
+        self.backlog = app.config.get('CHAT_STREAM_BACKLOG', self.backlog)
+        self.max_subscribers = app.config.get('STREAM_MAX_PER_WORKER', self.max_subscribers)
+        self._recent = deque(maxlen=self.backlog)
+        app.extensions['chat_hub'] = self
+
+    def notify(self):
+        """Check for new messages now (call after committing one)"""
+        self._wakeup.set()
+
+    def _start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='chat-hub', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+            with self._lock:
+                if not self._subscribers:
+                    # Nobody listens: forget the position and start fresh
+                    self._last_id = None
+                    continue
+            try:
+                self._poll()
+            except Exception:
+                self.app.logger.exception('Chat stream poll failed')
+
+    def _latest_id(self):
+        from app import db
+        from app.models import ChatMessage
+
+        return db.session.query(db.func.max(ChatMessage.id)).scalar() or 0
+
+    def _poll(self):
+        from app import db
+        from app.models import ChatMessage
+        from sqlalchemy.orm import joinedload
+
+        with self.app.app_context():
+            try:
+                latest = self._latest_id()
+                with self._lock:
+                    if self._last_id is None:
+                        self._start_at(latest)
+                    last_id = self._last_id
+                if latest <= last_id:
+                    return
+
+                messages = ChatMessage.query.options(joinedload(ChatMessage.author)) \
+                    .filter(ChatMessage.id > last_id, ChatMessage.id <= latest) \
+                    .order_by(ChatMessage.id.asc()).all()
+                payloads = [message.to_dict() for message in messages]
+            finally:
+                db.session.remove()
+
+        with self._lock:
+            if self._last_id != last_id:
+                return
+            for payload in payloads:
+                if len(self._recent) == self._recent.maxlen:
+                    self._floor = self._recent[0]['id']
+                self._recent.append(payload)
+            self._last_id = latest
+            subscribers = list(self._subscribers)
+
+        if payloads:
+            for subscriber in subscribers:
+                subscriber.put(payloads)
+
+    def _start_at(self, latest):
+        # Called with the lock held
+        self._last_id = self._floor = latest
+        self._recent.clear()
+
+    def subscribe(self, after_id=None):
+        """Register a subscriber queue and return it with the messages missed since ``after_id``
+
+        Call inside an app context. Messages are only loaded from the
+        database when ``after_id`` is older than the in-memory backlog.
+        Raises StreamLimitReached when every stream slot is taken.
+        """
+        from app.models import ChatMessage
+        from sqlalchemy.orm import joinedload
+
+        latest = self._latest_id()
+
+        subscriber = queue.Queue()
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise StreamLimitReached()
+            if self._last_id is None:
+                self._start_at(latest)
+            self._subscribers.add(subscriber)
+            last_id = self._last_id
+            covered = after_id is None or after_id >= self._floor
+            missed = [payload for payload in self._recent if after_id is not None and payload['id'] > after_id]
+        self._start()
+
+        if not covered:
+            messages = ChatMessage.query.options(joinedload(ChatMessage.author)) \
+                .filter(ChatMessage.id > after_id, ChatMessage.id <= last_id) \
+                .order_by(ChatMessage.id.desc()).limit(self.backlog).all()
+            missed = [message.to_dict() for message in reversed(messages)]
+        return subscriber, missed
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def events(self, subscriber, missed, after_id=None):
+        """Server-Sent Events for a subscriber, ending after ``max_duration``
+
+        The client's EventSource then reconnects on its own with
+        ``Last-Event-ID``.
+        """
+        cursor = after_id or 0
+        deadline = time.monotonic() + self.max_duration
+        try:
+            yield 'retry: 3000\n\n'
+            batch = missed
+            while True:
+                for payload in batch:
+                    if payload['id'] > cursor:
+                        cursor = payload['id']
+                        yield f"id: {cursor}\nevent: message\ndata: {json.dumps(payload)}\n\n"
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    batch = subscriber.get(timeout=min(self.heartbeat, remaining))
+                except queue.Empty:
+                    batch = []
+                    yield ': keepalive\n\n'
+        finally:
+            self.unsubscribe(subscriber)
+
+
+chat_hub = ChatHub()
+
+
+def notify_chat():
+    """Push newly committed chat messages to stream subscribers"""
+    chat_hub.notify()
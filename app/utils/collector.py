@@ -0,0 +1,161 @@
+import threading
+import time
+from datetime import datetime
+
+from app.utils.system_info import get_system_info, set_hot_backend
+from app.utils.write_behind import write_behind
+
+
+class MetricsCollector:
+    """Background sampler that keeps the latest system snapshot in memory.
+
+    Every worker process runs one daemon thread that calls ``get_system_info``
+    on a fixed cadence. Request handlers read the cached snapshot instead of
+    sampling themselves, so they never block on ``psutil``.
+
+    The collector is also the only producer of SystemMetrics rows: the first
+    sample in each ``bucket_seconds`` window is stored with the bucket start
+    as its timestamp, so history grows with wall-clock time rather than with
+    the number of open dashboards.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.interval = 5
+        self.bucket_seconds = 60
+        self.compaction_interval = 3600
+        self._last_compaction = None
+        self._snapshot = None
+        self._sampled_at = None
+        self._last_bucket = None
+        self._sample_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config.get('METRICS_SAMPLE_INTERVAL', 5)
+        self.bucket_seconds = app.config.get('METRICS_BUCKET_SECONDS', 60)
+        self.compaction_interval = app.config.get('METRICS_COMPACTION_INTERVAL', 3600)
+
+        backend = app.config.get('SYSTEM_INFO_BACKEND', 'psutil')
+        if backend == 'procfs':
+            set_hot_backend(backend, proc_root=app.config.get('PROCFS_ROOT', '/proc'))
+        else:
+            set_hot_backend(backend)
+        app.extensions['metrics_collector'] = self
+
+        if app.config.get('METRICS_COLLECTOR_ENABLED', True):
+            self.start()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the sampling thread (no-op when it is already running)"""
+        if self.running:
+            return
+
+        # Prime psutil's CPU counters so the first non-blocking sample is meaningful
+        get_system_info(cpu_interval=None)
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='metrics-collector', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the sampling thread"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            started = time.monotonic()
+            self.sample()
+            self._maybe_compact()
+            elapsed = time.monotonic() - started
+            self._stop_event.wait(max(self.interval - elapsed, 0))
+
+    def _maybe_compact(self):
+        now = time.monotonic()
+        if self.app is None or (self._last_compaction is not None and
+                                now - self._last_compaction < self.compaction_interval):
+            return
+        self._last_compaction = now
+
+        from app import db
+        from app.utils.rollups import compact_metrics
+
+        with self.app.app_context():
+            try:
+                compact_metrics()
+            except Exception:
+                db.session.rollback()
+                self.app.logger.exception('Metrics compaction failed')
+            finally:
+                db.session.remove()
+
+    def sample(self):
+        """Take a sample now and make it the current snapshot"""
+        with self._sample_lock:
+            snapshot = get_system_info(cpu_interval=None)
+            self._store(snapshot, time.time())
+            return snapshot
+
+    def _store(self, snapshot, sampled_at):
+        # Caller holds _sample_lock
+        self._snapshot = snapshot
+        self._sampled_at = sampled_at
+
+        bucket = int(sampled_at // self.bucket_seconds)
+        if bucket != self._last_bucket and 'error' not in snapshot:
+            self._last_bucket = bucket
+            write_behind.record_metrics(
+                snapshot, timestamp=datetime.utcfromtimestamp(bucket * self.bucket_seconds))
+
+    def get_snapshot(self, fields=None):
+        """Return ``(snapshot, sampled_at)`` for the most recent sample.
+
+        When the sampling thread is not running (tests, one-off scripts) a
+        stale or missing snapshot is refreshed synchronously instead; if only
+        some ``fields`` are wanted, just the collectors for those fields run.
+        """
+        snapshot, sampled_at = self._snapshot, self._sampled_at
+
+        if not self.running and (snapshot is None or time.time() - sampled_at >= self.interval):
+            if fields is not None:
+                return get_system_info(cpu_interval=None, fields=fields), time.time()
+
+            with self._sample_lock:
+                if self._snapshot is snapshot:
+                    self._store(get_system_info(cpu_interval=None), time.time())
+            snapshot, sampled_at = self._snapshot, self._sampled_at
+
+        return snapshot, sampled_at
+
+
+collector = MetricsCollector()
+
+
+def get_system_snapshot(fields=None):
+    """Get the latest system information sampled by the background collector
+
+    ``fields`` limits the result to those keys (see ``resolve_system_info_fields``).
+    """
+    snapshot, sampled_at = collector.get_snapshot(fields)
+
+    if fields is None:
+        info = dict(snapshot)
+    else:
+        info = {field: snapshot[field] for field in fields if field in snapshot}
+        if 'error' in snapshot:
+            info['error'] = snapshot['error']
+    info['sampled_at'] = datetime.utcfromtimestamp(sampled_at).isoformat()
+    info['snapshot_age'] = round(max(time.time() - sampled_at, 0), 3)
+    return info
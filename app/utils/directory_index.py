@@ -0,0 +1,178 @@
+import os
+import queue
+import threading
+from datetime import datetime, timedelta
+
+from app.utils.upserts import upsert
+
+# Stored as the size of a directory that could not be read
+UNREADABLE = -1
+
+
+def walk_directory_sizes(root):
+    """Return ``{path: (mtime, size)}`` for ``root`` and every directory below it
+
+    One bottom-up walk: each directory's size is its files plus the sizes of
+    its subdirectories, so every file is stat'ed once. Symlinked directories
+    are not followed. Directories that cannot be listed get the size
+    ``UNREADABLE`` and count as empty in their parents.
+    """
+    sizes = {}
+
+    def unreadable(error):
+        try:
+            sizes[error.filename] = (os.stat(error.filename).st_mtime, UNREADABLE)
+        except OSError:
+            pass
+
+    for dirpath, dirnames, filenames in os.walk(root, topdown=False, onerror=unreadable):
+        try:
+            mtime = os.stat(dirpath).st_mtime
+        except OSError:
+            continue
+        total = 0
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                continue
+        for dirname in dirnames:
+            child = sizes.get(os.path.join(dirpath, dirname))
+            if child is not None and child[1] != UNREADABLE:
+                total += child[1]
+        sizes[dirpath] = (mtime, total)
+    return sizes
+
+
+class DirectorySizeIndex:
+    """Persisted directory sizes, computed off the request path.
+
+    ``lookup()`` answers from the ``DirectorySize`` table only. An entry is
+    ``fresh`` while the directory's mtime matches and it is younger than
+    ``max_age`` (an mtime only changes with the directory's own entries, so
+    the age bounds how long changes deeper down go unnoticed); otherwise it
+    is ``stale`` and still shown, or ``pending`` when there is none yet.
+    Directories that could not be read are ``unreadable`` until their entry
+    goes stale.
+    Stale and missing directories are queued for one background thread per
+    worker, which walks each once and stores the sizes of every directory
+    below it too.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.max_age = 3600
+        self.batch_size = 500
+        self._queue = queue.Queue()
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.max_age = app.config.get('DIRECTORY_SIZE_MAX_AGE', self.max_age)
+        app.extensions['directory_size_index'] = self
+
+    def lookup(self, mtimes):
+        """Sizes for ``{path: current mtime}`` as ``{path: (size or None, status)}``
+
+        Queues a refresh for every directory that is neither fresh nor
+        unreadable.
+        """
+        from app import db
+        from app.models import DirectorySize
+
+        with self.app.app_context():
+            try:
+                entries = {
+                    path: (mtime, size, computed_at)
+                    for path, mtime, size, computed_at in db.session.query(
+                        DirectorySize.path, DirectorySize.mtime, DirectorySize.size, DirectorySize.computed_at
+                    ).filter(DirectorySize.path.in_(list(mtimes)))
+                }
+            finally:
+                db.session.remove()
+
+        expires = datetime.utcnow() - timedelta(seconds=self.max_age)
+        results = {}
+        for path, mtime in mtimes.items():
+            entry = entries.get(path)
+            if entry is None:
+                results[path] = (None, 'pending')
+            elif entry[0] != mtime or entry[2] < expires:
+                results[path] = (None if entry[1] == UNREADABLE else entry[1], 'stale')
+            elif entry[1] == UNREADABLE:
+                results[path] = (None, 'unreadable')
+            else:
+                results[path] = (entry[1], 'fresh')
+
+            if results[path][1] in ('pending', 'stale'):
+                self.enqueue(path)
+        return results
+
+    def enqueue(self, path):
+        """Queue ``path`` for a background walk unless it is already waiting"""
+        with self._lock:
+            if path in self._queued:
+                return
+            self._queued.add(path)
+        self._queue.put(path)
+        self._start()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='directory-size-index', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            path = self._queue.get()
+            try:
+                self.refresh(path)
+            except Exception:
+                self.app.logger.exception('Directory size walk failed for %s', path)
+            finally:
+                with self._lock:
+                    self._queued.discard(path)
+
+    def refresh(self, path):
+        """Walk ``path`` now and store its size and those of its subdirectories"""
+        sizes = walk_directory_sizes(path)
+        if path not in sizes:
+            # Vanished before the walk could stat it
+            self.app.logger.warning('Directory size walk found nothing at %s', path)
+        self.store(sizes)
+
+    def store(self, sizes):
+        """Upsert ``{path: (mtime, size)}``
+
+        Every worker walks on its own, so two of them may store the same
+        directories at once; the later write wins.
+        """
+        from app import db
+        from app.models import DirectorySize
+
+        computed_at = datetime.utcnow()
+        rows = [
+            {'path': path, 'mtime': mtime, 'size': size, 'computed_at': computed_at}
+            for path, (mtime, size) in sizes.items()
+        ]
+        with self.app.app_context():
+            try:
+                for start in range(0, len(rows), self.batch_size):
+                    upsert(db.session, DirectorySize.__table__, rows[start:start + self.batch_size],
+                           'path', ('mtime', 'size', 'computed_at'))
+                    db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+
+
+directory_size_index = DirectorySizeIndex()
@@ -0,0 +1,57 @@
+def lttb_indices(xs, ys, threshold):
+    """Largest-Triangle-Three-Buckets: pick ``threshold`` indices that keep the shape
+
+    ``xs`` and ``ys`` are equally long numeric sequences (``None`` in ``ys``
+    counts as 0). The first and last points are always kept; every bucket in
+    between contributes the point forming the largest triangle with the
+    previously chosen point and the average of the next bucket.
+    """
+    count = len(xs)
+    if threshold >= count or count <= 2:
+        return list(range(count))
+    if threshold < 3:
+        return [0, count - 1][:max(threshold, 0)]
+
+    ys = [0.0 if y is None else y for y in ys]
+    every = (count - 2) / (threshold - 2)
+    selected = [0]
+    previous = 0
+
+    for bucket in range(threshold - 2):
+        # Average of the following bucket is the third triangle corner
+        avg_start = int((bucket + 1) * every) + 1
+        avg_end = min(int((bucket + 2) * every) + 1, count)
+        avg_length = avg_end - avg_start
+        avg_x = sum(xs[avg_start:avg_end]) / avg_length
+        avg_y = sum(ys[avg_start:avg_end]) / avg_length
+
+        range_start = int(bucket * every) + 1
+        range_end = int((bucket + 1) * every) + 1
+        point_x, point_y = xs[previous], ys[previous]
+
+        max_area = -1
+        chosen = range_start
+        for index in range(range_start, range_end):
+            area = abs((point_x - avg_x) * (ys[index] - point_y) -
+                       (point_x - xs[index]) * (avg_y - point_y))
+            if area > max_area:
+                max_area = area
+                chosen = index
+
+        selected.append(chosen)
+        previous = chosen
+
+    selected.append(count - 1)
+    return selected
+
+
+def downsample_columns(columns, x, y, points):
+    """Downsample a dict of equally long column lists to about ``points`` rows
+
+    Indices are chosen by LTTB over columns ``x`` and ``y`` and then applied
+    to every column, so all series stay aligned.
+    """
+    indices = lttb_indices(columns[x], columns[y], points)
+    if len(indices) == len(columns[x]):
+        return columns
+    return {name: [values[index] for index in indices] for name, values in columns.items()}
@@ -3,23 +3,32 @@ import shutil
 from flask import send_file, flash, redirect, url_for
 from werkzeug.utils import secure_filename
 
+from app.utils.directory_index import directory_size_index
+
 def get_smb_files(path):
-    """Get list of files and directories in SMB path"""
+    """Get list of files and directories in SMB path
+
+    Directory sizes come from the directory size index and are never
+    computed here: ``size_status`` is ``fresh``, ``stale`` (an older size,
+    being refreshed), ``pending`` (no size yet) or ``unreadable``.
+    """
     try:
         if not os.path.exists(path):
             return [{'name': 'SMB path not accessible', 'type': 'error', 'path': ''}]
         
         items = []
+        directories = {}
         for item in os.listdir(path):
             item_path = os.path.join(path, item)
             
             if os.path.isdir(item_path):
-                items.append({
+                directory = {
                     'name': item,
                     'type': 'directory',
-                    'path': os.path.relpath(item_path, path),
-                    'size': get_directory_size(item_path)
-                })
+                    'path': os.path.relpath(item_path, path)
+                }
+                directories[os.path.abspath(item_path)] = directory
+                items.append(directory)
             else:
                 items.append({
                     'name': item,
@@ -29,6 +38,12 @@ def get_smb_files(path):
                     'modified': os.path.getmtime(item_path)
                 })
         
+        if directories:
+            mtimes = {item_path: os.path.getmtime(item_path) for item_path in directories}
+            for item_path, (size, status) in directory_size_index.lookup(mtimes).items():
+                directories[item_path]['size'] = size
+                directories[item_path]['size_status'] = status
+        
         # Sort directories first, then files
         items.sort(key=lambda x: (x['type'] != 'directory', x['name'].lower()))
         return items
@@ -38,21 +53,6 @@ def get_smb_files(path):
     except Exception as e:
         return [{'name': f'Error accessing SMB path: {str(e)}', 'type': 'error', 'path': ''}]
 
-def get_directory_size(path):
-    """Calculate total size of directory"""
-    try:
-        total_size = 0
-        for dirpath, dirnames, filenames in os.walk(path):
-            for filename in filenames:
-                filepath = os.path.join(dirpath, filename)
-                try:
-                    total_size += os.path.getsize(filepath)
-                except (OSError, IOError):
-                    continue
-        return total_size
-    except:
-        return 0
-
 def download_smb_file(base_path, filename):
     """Download a file from SMB share"""
     try:
@@ -0,0 +1,71 @@
+import json
+import queue
+import time
+
+_MISSING = object()
+
+
+def format_event(event, data, event_id=None):
+    """One Server-Sent Events message"""
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def changed_fields(previous, state):
+    """Keys of ``state`` whose values differ from ``previous``"""
+    return {key: value for key, value in state.items() if previous.get(key, _MISSING) != value}
+
+
+def live_events(subscriber, missed, sources, after_id=None, heartbeat=15, max_duration=300):
+    """Server-Sent Events multiplexing chat messages with polled state
+
+    Chat messages come from a ``chat_hub`` subscriber as ``chat`` events and
+    are the only events with an id, so a reconnecting EventSource resumes
+    the chat with ``Last-Event-ID``. ``sources`` maps an event name to
+    ``(interval, load)``: every ``interval`` seconds ``load()`` returns a
+    dict, and only the keys that changed since the last event are sent (all
+    of them in the first one). A keep-alive comment goes out when nothing
+    was sent for ``heartbeat`` seconds; the stream ends after
+    ``max_duration`` and the browser reconnects.
+    """
+    cursor = after_id or 0
+    started = last_sent = time.monotonic()
+    deadline = started + max_duration
+    due = {name: started for name in sources}
+    state = {name: {} for name in sources}
+
+    yield 'retry: 3000\n\n'
+    batch = missed
+    while True:
+        for payload in batch:
+            if payload['id'] > cursor:
+                cursor = payload['id']
+                last_sent = time.monotonic()
+                yield format_event('chat', payload, cursor)
+
+        now = time.monotonic()
+        for name, (interval, load) in sources.items():
+            if now < due[name]:
+                continue
+            due[name] = now + interval
+            current = load()
+            changes = changed_fields(state[name], current)
+            if changes:
+                state[name] = current
+                last_sent = time.monotonic()
+                yield format_event(name, changes)
+
+        now = time.monotonic()
+        if now >= deadline:
+            return
+        if now - last_sent >= heartbeat:
+            last_sent = now
+            yield ': keepalive\n\n'
+
+        wait = min([deadline, last_sent + heartbeat] + list(due.values())) - now
+        try:
+            batch = subscriber.get(timeout=max(wait, 0))
+        except queue.Empty:
+            batch = []
@@ -0,0 +1,108 @@
+import csv
+import io
+import json
+
+from app.utils.rollups import EPOCH
+
+EXPORT_FORMATS = ('json', 'ndjson', 'csv', 'columnar')
+
+EXPORT_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'columnar': 'application/json'
+}
+
+# Shorter keys for the columnar layout; other columns keep their names
+COLUMNAR_NAMES = {
+    'timestamp': 't',
+    'cpu_percent': 'cpu',
+    'memory_percent': 'memory',
+    'disk_percent': 'disk'
+}
+
+# Rows buffered per chunk written to the response
+CHUNK_ROWS = 500
+
+
+def _epoch_seconds(timestamp):
+    seconds = (timestamp - EPOCH).total_seconds()
+    return int(seconds) if seconds.is_integer() else round(seconds, 3)
+
+
+def _deltas(values):
+    previous = 0
+    for value in values:
+        yield round(value - previous, 3)
+        previous = value
+
+
+def _chunked(lines):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= CHUNK_ROWS:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def iter_ndjson(names, rows):
+    """One JSON object per line, timestamps in ISO format"""
+    position = names.index('timestamp')
+
+    def lines():
+        for row in rows:
+            row = list(row)
+            row[position] = row[position].isoformat()
+            yield json.dumps(dict(zip(names, row))) + '\n'
+
+    return _chunked(lines())
+
+
+def iter_csv(names, rows):
+    """CSV with a header line, timestamps in ISO format"""
+    position = names.index('timestamp')
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def lines():
+        writer.writerow(names)
+        for row in rows:
+            row = list(row)
+            row[position] = row[position].isoformat()
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    return _chunked(lines())
+
+
+def iter_columnar(names, column, resolution):
+    """One JSON object with an array per column
+
+    ``column(name)`` returns an iterable of that column's values, so every
+    array is streamed on its own. ``t`` is delta encoded: the first value is
+    the epoch seconds of the first row and each following value the seconds
+    since the previous row. Rollup rows carry their tier's resolution, which
+    is the same for every row and already given once as ``resolution``.
+    """
+    yield '{"resolution": %s' % json.dumps(resolution)
+
+    for name in names:
+        if name == 'resolution':
+            continue
+        yield ', %s: [' % json.dumps(COLUMNAR_NAMES.get(name, name))
+
+        values = column(name)
+        if name == 'timestamp':
+            values = _deltas(_epoch_seconds(timestamp) for timestamp in values)
+
+        yield from _chunked(
+            (', ' if index else '') + json.dumps(value)
+            for index, value in enumerate(values)
+        )
+        yield ']'
+
+    yield '}\n'
@@ -0,0 +1,102 @@
+import math
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from app import db
+from app.models import SystemMetrics, MetricsRollup
+from app.utils.rollups import RAW_SOURCE, ROLLUP_METRICS, choose_history_source, filter_history, source_resolution
+
+PERCENTILES = (50, 95, 99)
+
+# Critical levels from the colour legend on the metrics page
+DEFAULT_THRESHOLDS = {
+    'cpu': 90,
+    'memory': 90,
+    'disk': 95
+}
+
+
+def stats_source(since):
+    """Raw samples while they still cover ``since``, else the finest covering rollup tier"""
+    raw_retention = current_app.config.get('METRICS_RAW_RETENTION_DAYS', 2)
+    if datetime.utcnow() - timedelta(days=raw_retention) <= since:
+        return RAW_SOURCE
+    return choose_history_source(since, resolution=1)
+
+
+def _expressions(source, prefix):
+    """Per-row value plus (min, max, sum, sample count) aggregates for one metric"""
+    if source == RAW_SOURCE:
+        value = getattr(SystemMetrics, ROLLUP_METRICS[prefix])
+        return value, (db.func.min(value), db.func.max(value), db.func.sum(value), db.func.count(value))
+
+    total = getattr(MetricsRollup, f'{prefix}_sum')
+    value = total / MetricsRollup.sample_count
+    return value, (
+        db.func.min(getattr(MetricsRollup, f'{prefix}_min')),
+        db.func.max(getattr(MetricsRollup, f'{prefix}_max')),
+        db.func.sum(total),
+        db.func.sum(db.case((total.isnot(None), MetricsRollup.sample_count), else_=0))
+    )
+
+
+def _percentile(query, value, count, percentile):
+    # Nearest-rank percentile; LIMIT/OFFSET lets SQLite keep a small sorter
+    # instead of returning every value
+    rank = max(math.ceil(percentile / 100 * count), 1)
+    row = query.order_by(value.asc()).offset(rank - 1).limit(1).first()
+    return round(row[0], 2) if row else None
+
+
+def metrics_stats(since, until=None, thresholds=None):
+    """Min/max/avg, percentiles and time above a threshold for CPU, memory and disk
+
+    Everything is aggregated in SQL. Raw samples are used while they cover
+    the window; older windows fall back to a rollup tier, where min, max and
+    avg stay exact but percentiles and time above the threshold are computed
+    from bucket averages (``approximate`` is then true).
+    """
+    until = until or datetime.utcnow()
+    thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+    source = stats_source(since)
+    resolution = source_resolution(source)
+
+    values = {}
+    aggregates = [db.func.count()]
+    for prefix in ROLLUP_METRICS:
+        value, columns = _expressions(source, prefix)
+        values[prefix] = value
+        aggregates += columns
+        aggregates += [
+            db.func.count(value),
+            db.func.sum(db.case((value > thresholds[prefix], 1), else_=0))
+        ]
+    row = filter_history(db.session.query(*aggregates), since, source, until).one()
+
+    stats = {}
+    for index, prefix in enumerate(ROLLUP_METRICS):
+        minimum, maximum, total, samples, rows, above = row[1 + index * 6:7 + index * 6]
+        metric = {
+            'min': minimum,
+            'max': maximum,
+            'avg': round(total / samples, 2) if samples else None,
+            'threshold': thresholds[prefix],
+            'seconds_above': (above or 0) * resolution,
+            'percent_above': round(above * 100 / rows, 2) if rows else None
+        }
+
+        query = filter_history(db.session.query(values[prefix]), since, source, until) \
+            .filter(values[prefix].isnot(None))
+        for percentile in PERCENTILES:
+            metric[f'p{percentile}'] = _percentile(query, values[prefix], rows, percentile) if rows else None
+        stats[prefix] = metric
+
+    return {
+        'since': since.isoformat(),
+        'until': until.isoformat(),
+        'resolution': resolution,
+        'approximate': source != RAW_SOURCE,
+        'rows': row[0],
+        'metrics': stats
+    }
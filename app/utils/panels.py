@@ -0,0 +1,80 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class PanelCollector:
+    """Loads page panels concurrently on a bounded thread pool.
+
+    ``collect()`` starts every panel at once and waits at most ``timeout``
+    seconds; panels that are not ready by then come back as None so the
+    page can render a placeholder and hydrate it from the API. A late panel
+    keeps running, and asking for the same panel again while it runs joins
+    that load instead of starting another one. The API that fills in a
+    placeholder waits up to ``api_timeout`` for it, so a hung source (a
+    stuck SMB mount) never holds a request thread for good.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.max_workers = 4
+        self.timeout = 0.5
+        self.api_timeout = 10
+        self._executor = None
+        self._pending = {}
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.max_workers = app.config.get('PANEL_WORKERS', self.max_workers)
+        self.timeout = app.config.get('PANEL_TIMEOUT', self.timeout)
+        self.api_timeout = app.config.get('PANEL_API_TIMEOUT', self.api_timeout)
+        app.extensions['panel_collector'] = self
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='panel')
+            return self._executor
+
+    def submit(self, func, *args):
+        """Start ``func(*args)``, or return the future of the same call still running"""
+        executor = self.executor
+        key = (func, args)
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None:
+                return future
+            future = executor.submit(func, *args)
+            self._pending[key] = future
+        # Outside the lock: the callback runs right away if it already finished
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+    def collect(self, panels, timeout=None):
+        """Run ``{name: (func, *args)}`` and return ``{name: result or None}``
+
+        A panel that fails or misses the deadline is None.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        futures = {name: self.submit(*panel) for name, panel in panels.items()}
+        wait(futures.values(), timeout=timeout)
+
+        results = {}
+        for name, future in futures.items():
+            if future.done() and future.exception() is None:
+                results[name] = future.result()
+            else:
+                results[name] = None
+        return results
+
+
+panel_collector = PanelCollector()
@@ -0,0 +1,70 @@
+import os
+from functools import wraps
+
+from flask import current_app, g
+
+
+class PollAdvisor:
+    """Tells polling clients when to ask again with an ``X-Poll-Interval`` header.
+
+    Routes name their base cadence with ``@poll_hint(...)``: how often their
+    data can change at all, e.g. the collector's sample interval. The hint
+    stretches that base while the host is loaded (1-minute load average per
+    CPU above 1) and doubles it when the client already had the data (a 304),
+    within ``POLL_MIN_INTERVAL`` and ``POLL_MAX_INTERVAL`` seconds.
+    """
+
+    def __init__(self, app=None):
+        self.min_interval = 2
+        self.max_interval = 300
+        self.max_load_factor = 4
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.min_interval = app.config.get('POLL_MIN_INTERVAL', self.min_interval)
+        self.max_interval = app.config.get('POLL_MAX_INTERVAL', self.max_interval)
+        self.max_load_factor = app.config.get('POLL_MAX_LOAD_FACTOR', self.max_load_factor)
+        # Registered before the ETag layer, so this runs after it and sees its 304s
+        app.after_request(self.process_response)
+        app.extensions['poll_advisor'] = self
+
+    def load_factor(self):
+        """How far the host is over capacity, from 1 (idle enough) up to ``max_load_factor``"""
+        try:
+            load = os.getloadavg()[0] / (os.cpu_count() or 1)
+        except OSError:
+            return 1
+        return min(max(load, 1), self.max_load_factor)
+
+    def interval(self, base, unchanged=False):
+        """Seconds until the next poll of data that changes about every ``base`` seconds"""
+        interval = base * self.load_factor()
+        if unchanged:
+            interval *= 2
+        return round(min(max(interval, self.min_interval), self.max_interval), 1)
+
+    def process_response(self, response):
+        base = g.pop('poll_base', None)
+        if base is not None and response.status_code in (200, 304):
+            response.headers['X-Poll-Interval'] = f'{self.interval(base, response.status_code == 304):g}'
+        return response
+
+
+poll_advisor = PollAdvisor()
+
+
+def poll_hint(base):
+    """Send a next-poll hint with the responses of a route
+
+    ``base`` is the seconds between changes of the route's data, or the name
+    of a config setting holding it.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            g.poll_base = current_app.config.get(base) if isinstance(base, str) else base
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
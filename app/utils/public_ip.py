@@ -0,0 +1,103 @@
+import threading
+import time
+
+import requests
+
+PENDING_PUBLIC_IP = 'Resolving...'
+UNKNOWN_PUBLIC_IP = 'Unable to get public IP'
+
+
+class PublicIPResolver:
+    """TTL-cached public IP lookup that never blocks the caller.
+
+    ``get()`` always returns the last known value immediately. When the cached
+    value has expired a single background thread re-resolves it. Failed
+    lookups are cached for ``failure_ttl`` so an offline host does not retry
+    on every poll, and a previously resolved address is kept until a lookup
+    succeeds again.
+    """
+
+    def __init__(self, app=None):
+        self.endpoint = 'https://api.ipify.org'
+        self.ttl = 600
+        self.failure_ttl = 60
+        self.timeout = 5
+        self._value = None
+        self._expires_at = 0
+        self._last_error = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.endpoint = app.config.get('PUBLIC_IP_ENDPOINT', self.endpoint)
+        self.ttl = app.config.get('PUBLIC_IP_TTL', self.ttl)
+        self.failure_ttl = app.config.get('PUBLIC_IP_FAILURE_TTL', self.failure_ttl)
+        self.timeout = app.config.get('PUBLIC_IP_TIMEOUT', self.timeout)
+        self.invalidate()
+        app.extensions['public_ip_resolver'] = self
+
+    def get(self):
+        """Return the cached public IP, scheduling a refresh if it has expired"""
+        if time.time() >= self._expires_at:
+            self._schedule_refresh()
+
+        if self._value is not None:
+            return self._value
+        if self._last_error is not None:
+            return UNKNOWN_PUBLIC_IP
+        return PENDING_PUBLIC_IP
+
+    def invalidate(self):
+        """Forget the cached value so the next ``get()`` re-resolves it"""
+        with self._lock:
+            self._value = None
+            self._last_error = None
+            self._expires_at = 0
+
+    def refresh(self):
+        """Resolve the public IP synchronously and update the cache"""
+        if not self.endpoint:
+            with self._lock:
+                self._last_error = 'No public IP endpoint configured'
+                self._expires_at = float('inf')
+            return self._value
+
+        try:
+            response = requests.get(self.endpoint, timeout=self.timeout)
+            response.raise_for_status()
+            value = response.text.strip()
+            if not value:
+                raise ValueError('Empty response from public IP endpoint')
+        except Exception as e:
+            with self._lock:
+                self._last_error = str(e)
+                self._expires_at = time.time() + self.failure_ttl
+            return self._value
+
+        with self._lock:
+            self._value = value
+            self._last_error = None
+            self._expires_at = time.time() + self.ttl
+        return value
+
+    def _schedule_refresh(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        thread = threading.Thread(target=self._refresh_in_background, name='public-ip-refresh', daemon=True)
+        thread.start()
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+
+public_ip_resolver = PublicIPResolver()
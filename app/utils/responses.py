@@ -0,0 +1,156 @@
+import gzip
+import hashlib
+import os
+import zlib
+
+from flask import current_app, g, request, url_for
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+    'application/javascript', 'application/json', 'image/svg+xml'
+}
+
+
+class ResponseLayer:
+    """App-wide response handling: compression, ETags and static asset caching.
+
+    Responses of a compressible type above ``COMPRESS_MIN_SIZE`` bytes are
+    gzip- or deflate-encoded when the client accepts it. JSON responses get a
+    weak ETag from their body and an empty 304 when ``If-None-Match`` still
+    matches; routes that set their own ETag keep it. ``static_url()`` in
+    templates adds a content fingerprint to static URLs, and fingerprinted
+    requests are cached by browsers for a year, and their compressed bytes
+    are kept per fingerprint. Streamed responses (Server-Sent Events,
+    exports) pass through untouched.
+
+    Responses that embed the CSRF token are never compressed: a secret in a
+    compressed body next to reflected request data (e.g. echoed query
+    parameters) can be recovered from the response size (BREACH).
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.min_size = 500
+        self.level = 6
+        self.static_max_age = 365 * 24 * 3600
+        self._fingerprints = {}
+        self._compressed = {}
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', self.min_size)
+        self.level = app.config.get('COMPRESS_LEVEL', self.level)
+        self.static_max_age = app.config.get('STATIC_MAX_AGE', self.static_max_age)
+        self._fingerprints = {}
+        self._compressed = {}
+        app.add_template_global(self.static_url)
+        app.after_request(self.process_response)
+        app.extensions['response_layer'] = self
+
+    def fingerprint(self, filename):
+        """Short content hash of a static file, recomputed when the file changes"""
+        path = os.path.join(self.app.static_folder, filename)
+        mtime = os.stat(path).st_mtime_ns
+        cached = self._fingerprints.get(filename)
+        if cached is None or cached[0] != mtime:
+            with open(path, 'rb') as f:
+                cached = (mtime, hashlib.md5(f.read()).hexdigest()[:12])
+            self._fingerprints[filename] = cached
+        return cached[1]
+
+    def static_url(self, filename):
+        """URL of a static file that changes whenever its content does"""
+        return url_for('static', filename=filename, v=self.fingerprint(filename))
+
+    def process_response(self, response):
+        if request.endpoint == 'static':
+            self._cache_static(response)
+        elif response.mimetype == 'application/json':
+            self._add_etag(response)
+        self._compress(response)
+        return response
+
+    def _cache_static(self, response):
+        filename = request.view_args.get('filename', '')
+        version = request.args.get('v')
+        if response.status_code not in (200, 304) or not version:
+            return
+        try:
+            current = self.fingerprint(filename)
+        except OSError:
+            return
+        # An outdated fingerprint must not pin the new content for a year
+        if version == current:
+            response.headers['Cache-Control'] = f'public, max-age={self.static_max_age}, immutable'
+
+    def _add_etag(self, response):
+        if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+            return
+        if response.is_streamed or 'ETag' in response.headers:
+            return
+        response.add_etag(weak=True)
+        if 'Cache-Control' not in response.headers:
+            response.headers['Cache-Control'] = 'private, no-cache'
+        response.make_conditional(request, accept_ranges=False)
+
+    def _compress(self, response):
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return
+        response.vary.add('Accept-Encoding')
+        if response.status_code != 200 or 'Content-Encoding' in response.headers:
+            return
+        if current_app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token') in g:
+            # The page rendered a CSRF token (BREACH)
+            return
+        if response.is_streamed and request.endpoint != 'static':
+            return
+
+        encoding = request.accept_encodings.best_match(['gzip', 'deflate'])
+        if encoding is None:
+            return
+
+        if request.endpoint == 'static':
+            data = self._compressed_static(response, encoding)
+        else:
+            data = self._encode(response.get_data(), encoding)
+        if data is None:
+            return
+        response.set_data(data)
+        response.headers['Content-Encoding'] = encoding
+
+        # The encoded bytes differ, so a strong validator becomes a weak one
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+
+    def _encode(self, data, encoding):
+        """``data`` compressed with ``encoding``, or None when it is too small to bother"""
+        if len(data) < self.min_size:
+            return None
+        if encoding == 'gzip':
+            return gzip.compress(data, compresslevel=self.level, mtime=0)
+        return zlib.compress(data, self.level)
+
+    def _compressed_static(self, response, encoding):
+        # Static files only change with their fingerprint: compress each once
+        filename = request.view_args.get('filename', '')
+        try:
+            fingerprint = self.fingerprint(filename)
+        except OSError:
+            return None
+
+        cached = self._compressed.get((filename, encoding))
+        if cached is None or cached[0] != fingerprint:
+            # Sent from disk by default; read the file to compress it
+            response.direct_passthrough = False
+            cached = (fingerprint, self._encode(response.get_data(), encoding))
+            self._compressed[(filename, encoding)] = cached
+        elif response.is_streamed:
+            response.response.close()
+        return cached[1]
+
+
+response_layer = ResponseLayer()
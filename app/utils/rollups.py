@@ -0,0 +1,287 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.models import SystemMetrics, MetricsRollup
+
+EPOCH = datetime(1970, 1, 1)
+
+# Rollup column prefix -> SystemMetrics column
+ROLLUP_METRICS = {
+    'cpu': 'cpu_percent',
+    'memory': 'memory_percent',
+    'disk': 'disk_percent'
+}
+
+# Used for raw SystemMetrics in choose_history_source()
+RAW_SOURCE = 0
+
+
+def rollup_tiers():
+    """Configured ``(resolution_seconds, retention_days)`` tiers, finest first"""
+    return sorted(current_app.config.get('METRICS_ROLLUP_TIERS', ()))
+
+
+def bucket_start(timestamp, resolution):
+    """Start of the ``resolution``-second bucket containing ``timestamp``"""
+    seconds = int((timestamp - EPOCH).total_seconds())
+    return EPOCH + timedelta(seconds=seconds - seconds % resolution)
+
+
+def _fold(rollup, row):
+    """Add one raw sample (a SystemMetrics column dict) to a rollup bucket"""
+    rollup.sample_count = (rollup.sample_count or 0) + 1
+
+    for prefix, column in ROLLUP_METRICS.items():
+        value = row.get(column)
+        if value is None:
+            continue
+        low, high = getattr(rollup, f'{prefix}_min'), getattr(rollup, f'{prefix}_max')
+        setattr(rollup, f'{prefix}_min', value if low is None else min(low, value))
+        setattr(rollup, f'{prefix}_max', value if high is None else max(high, value))
+        setattr(rollup, f'{prefix}_sum', (getattr(rollup, f'{prefix}_sum') or 0) + value)
+
+    if rollup.last_sample_at is None or row['timestamp'] >= rollup.last_sample_at:
+        rollup.last_sample_at = row['timestamp']
+        for prefix, column in ROLLUP_METRICS.items():
+            setattr(rollup, f'{prefix}_last', row.get(column))
+        rollup.network_bytes_sent = row.get('network_bytes_sent')
+        rollup.network_bytes_recv = row.get('network_bytes_recv')
+
+
+def apply_sample(row):
+    """Fold a newly stored raw sample into every rollup tier (caller commits)"""
+    for resolution, _ in rollup_tiers():
+        start = bucket_start(row['timestamp'], resolution)
+        rollup = MetricsRollup.query.filter_by(resolution=resolution, bucket_start=start).first()
+        if rollup is None:
+            rollup = MetricsRollup(resolution=resolution, bucket_start=start, sample_count=0)
+            db.session.add(rollup)
+        _fold(rollup, row)
+
+
+def backfill_rollups(connection, batch_size=500):
+    """Build rollups from raw rows that predate them (migration step, on its ``connection``)
+
+    Raw rows are read oldest first, so each tier only holds its current
+    bucket in memory. A tier that already has rollups, e.g. from a collector
+    that started before the migration ran, is only filled in before its
+    earliest bucket. Returns the number of buckets created.
+    """
+    raw = SystemMetrics.__table__
+    rollups = MetricsRollup.__table__
+    columns = ['timestamp', 'network_bytes_sent', 'network_bytes_recv'] + list(ROLLUP_METRICS.values())
+
+    first_buckets = dict(connection.execute(
+        select(rollups.c.resolution, db.func.min(rollups.c.bucket_start)).group_by(rollups.c.resolution)
+    ).all())
+    current = {}
+    finished = []
+    created = 0
+
+    def flush():
+        nonlocal created
+        if finished:
+            connection.execute(rollups.insert(), [
+                {column.name: getattr(rollup, column.name) for column in rollups.columns if column.name != 'id'}
+                for rollup in finished
+            ])
+            created += len(finished)
+            finished.clear()
+
+    for values in connection.execute(select(*[raw.c[name] for name in columns]).order_by(raw.c.timestamp.asc())):
+        row = dict(zip(columns, values))
+        for resolution, _ in rollup_tiers():
+            first = first_buckets.get(resolution)
+            if first is not None and row['timestamp'] >= first:
+                continue
+            start = bucket_start(row['timestamp'], resolution)
+            rollup = current.get(resolution)
+            if rollup is None or rollup.bucket_start != start:
+                if rollup is not None:
+                    finished.append(rollup)
+                rollup = current[resolution] = MetricsRollup(resolution=resolution, bucket_start=start, sample_count=0)
+            _fold(rollup, row)
+        if len(finished) >= batch_size:
+            flush()
+
+    finished.extend(current.values())
+    flush()
+    return created
+
+
+def compact_metrics(now=None):
+    """Delete raw samples and rollups that are past their tier's retention"""
+    now = now or datetime.utcnow()
+
+    raw_cutoff = now - timedelta(days=current_app.config.get('METRICS_RAW_RETENTION_DAYS', 2))
+    deleted = {
+        'raw': SystemMetrics.query.filter(SystemMetrics.timestamp < raw_cutoff).delete(synchronize_session=False)
+    }
+
+    for resolution, retention_days in rollup_tiers():
+        cutoff = now - timedelta(days=retention_days)
+        deleted[resolution] = MetricsRollup.query.filter(
+            MetricsRollup.resolution == resolution,
+            MetricsRollup.bucket_start < cutoff
+        ).delete(synchronize_session=False)
+
+    db.session.commit()
+    return deleted
+
+
+def source_resolution(source):
+    """Effective resolution in seconds of a history source"""
+    if source == RAW_SOURCE:
+        return current_app.config.get('METRICS_BUCKET_SECONDS', 60)
+    return source
+
+
+def choose_history_source(since, until=None, resolution=None):
+    """Pick the coarsest source that still covers ``since`` at ``resolution``
+
+    Returns ``RAW_SOURCE`` for SystemMetrics or a rollup resolution. Without an
+    explicit ``resolution`` the range is split into at most
+    ``METRICS_HISTORY_MAX_POINTS`` points.
+    """
+    now = datetime.utcnow()
+    until = until or now
+
+    if not resolution:
+        max_points = current_app.config.get('METRICS_HISTORY_MAX_POINTS', 1000)
+        resolution = (until - since).total_seconds() / max_points
+
+    raw_retention = current_app.config.get('METRICS_RAW_RETENTION_DAYS', 2)
+    sources = rollup_tiers() + [(RAW_SOURCE, raw_retention)]
+
+    covering = [source for source in sources if now - timedelta(days=source[1]) <= since]
+    if not covering:
+        covering = [max(sources, key=lambda source: source[1])]
+
+    fine_enough = [source for source in covering if source_resolution(source[0]) <= resolution]
+    if fine_enough:
+        return max(fine_enough, key=lambda source: source_resolution(source[0]))[0]
+    return min(covering, key=lambda source: source_resolution(source[0]))[0]
+
+
+def filter_history(query, since, source, until=None):
+    """Limit a query on a history source to the ``since``..``until`` window"""
+    if source == RAW_SOURCE:
+        query = query.filter(SystemMetrics.timestamp >= since)
+        if until is not None:
+            query = query.filter(SystemMetrics.timestamp <= until)
+        return query
+
+    query = query.filter(
+        MetricsRollup.resolution == source,
+        MetricsRollup.bucket_start >= bucket_start(since, source)
+    )
+    if until is not None:
+        query = query.filter(MetricsRollup.bucket_start <= until)
+    return query
+
+
+def history_columns(source):
+    """``(name, column)`` pairs served by the history API for a source"""
+    if source == RAW_SOURCE:
+        return [
+            ('id', SystemMetrics.id),
+            ('timestamp', SystemMetrics.timestamp),
+            ('cpu_percent', SystemMetrics.cpu_percent),
+            ('memory_percent', SystemMetrics.memory_percent),
+            ('disk_percent', SystemMetrics.disk_percent),
+            ('network_bytes_sent', SystemMetrics.network_bytes_sent),
+            ('network_bytes_recv', SystemMetrics.network_bytes_recv),
+            ('load_average', SystemMetrics.load_average)
+        ]
+
+    columns = [
+        ('timestamp', MetricsRollup.bucket_start),
+        ('resolution', MetricsRollup.resolution),
+        ('samples', MetricsRollup.sample_count)
+    ]
+    for prefix, name in ROLLUP_METRICS.items():
+        average = getattr(MetricsRollup, f'{prefix}_sum') / MetricsRollup.sample_count
+        columns += [
+            (name, db.func.round(average, 2)),
+            (f'{prefix}_min', getattr(MetricsRollup, f'{prefix}_min')),
+            (f'{prefix}_max', getattr(MetricsRollup, f'{prefix}_max')),
+            (f'{prefix}_last', getattr(MetricsRollup, f'{prefix}_last'))
+        ]
+    columns += [
+        ('network_bytes_sent', MetricsRollup.network_bytes_sent),
+        ('network_bytes_recv', MetricsRollup.network_bytes_recv)
+    ]
+    return columns
+
+
+def history_query(since, source, names=None, until=None):
+    """Column query (no ORM objects) for history rows since ``since``, oldest first
+
+    ``names`` limits the query to some of the ``history_columns()`` and
+    ``until`` sets an upper bound. Queries that must agree on their rows run
+    on a ``history_snapshot()``.
+    """
+    columns = history_columns(source)
+    if names is not None:
+        columns = [(name, column) for name, column in columns if name in names]
+    query = db.session.query(*[column.label(name) for name, column in columns])
+    query = filter_history(query, since, source, until)
+
+    if source == RAW_SOURCE:
+        query = query.order_by(SystemMetrics.timestamp.asc())
+    else:
+        query = query.order_by(MetricsRollup.bucket_start.asc())
+
+    return [name for name, _ in columns], query
+
+
+def load_history_columns(since, source):
+    """History as a dict of column lists, e.g. ``{'timestamp': [...], 'cpu_percent': [...]}``"""
+    names, query = history_query(since, source)
+    rows = query.all()
+    return {name: [row[index] for row in rows] for index, name in enumerate(names)}
+
+
+@contextmanager
+def history_snapshot():
+    """Connection on which every history query sees the same state of the tables
+
+    SQLite's driver runs each SELECT in its own implicit transaction, so the
+    read transaction is opened explicitly. Unless the database is in WAL
+    mode, writers wait until it closes (see ``snapshot_blocks_writers()``).
+    Other databases get a repeatable-read transaction.
+    """
+    if db.engine.dialect.name == 'sqlite':
+        with db.engine.connect() as connection:
+            connection.exec_driver_sql('BEGIN')
+            try:
+                yield connection
+            finally:
+                connection.rollback()
+    else:
+        with db.engine.connect().execution_options(isolation_level='REPEATABLE READ') as connection:
+            with connection.begin():
+                yield connection
+
+
+def snapshot_blocks_writers():
+    """Whether an open ``history_snapshot()`` keeps writers waiting
+
+    True for SQLite outside WAL mode: there a reader's shared lock holds off
+    every commit.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    with db.engine.connect() as connection:
+        return connection.exec_driver_sql('PRAGMA journal_mode').scalar().lower() != 'wal'
+
+
+def iter_history_column(connection, since, source, name, chunk_size=1000):
+    """Stream the values of one history column on a ``history_snapshot()`` connection"""
+    _, query = history_query(since, source, [name])
+    for row in connection.execution_options(yield_per=chunk_size).execute(query.statement):
+        yield row[0]
@@ -0,0 +1,121 @@
+import threading
+import time
+from datetime import datetime
+
+from app.utils.system_info import get_service_statuses
+
+
+class _Probe:
+    """One in-flight ``systemctl`` probe that other callers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.results = {}
+
+
+class ServiceStatusCache:
+    """TTL cache in front of ``get_service_statuses`` with request coalescing.
+
+    Entries younger than ``max_age`` (default ``ttl``) are served from memory.
+    For stale services, the first caller runs one batched probe and any
+    concurrent caller asking for the same service waits for that probe
+    instead of forking its own ``systemctl``.
+
+    ``invalidate()`` bumps a generation counter: a probe that started before
+    it may have seen the state from before a service action, so its result
+    is still returned to its callers but never cached.
+    """
+
+    def __init__(self, app=None):
+        self.ttl = 5
+        self.probe_timeout = 15
+        self._entries = {}
+        self._probes = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('SERVICE_STATUS_TTL', self.ttl)
+        self.invalidate()
+        app.extensions['service_status_cache'] = self
+
+    def get(self, service_names, max_age=None):
+        """Map each of ``service_names`` to its details plus ``checked_at`` (epoch seconds)"""
+        names = list(dict.fromkeys(service_names))
+        max_age = self.ttl if max_age is None else max(max_age, 0)
+        now = time.time()
+
+        results = {}
+        leading = []
+        waiting = {}
+        probe = _Probe()
+
+        with self._lock:
+            generation = self._generation
+            for name in names:
+                entry = self._entries.get(name)
+                if entry is not None and now - entry['checked_at'] <= max_age:
+                    results[name] = entry
+                elif name in self._probes:
+                    waiting[name] = self._probes[name]
+                else:
+                    self._probes[name] = probe
+                    leading.append(name)
+
+        if leading:
+            try:
+                statuses = get_service_statuses(leading)
+                checked_at = time.time()
+                for name in leading:
+                    probe.results[name] = dict(statuses[name], checked_at=checked_at)
+            finally:
+                with self._lock:
+                    for name in leading:
+                        if name in probe.results and generation == self._generation:
+                            self._entries[name] = probe.results[name]
+                        if self._probes.get(name) is probe:
+                            del self._probes[name]
+                probe.done.set()
+            results.update(probe.results)
+
+        for name, other in waiting.items():
+            other.done.wait(self.probe_timeout)
+            results[name] = other.results.get(name, {'status': "timeout", 'checked_at': time.time()})
+
+        return {name: results[name] for name in names}
+
+    def invalidate(self, service_names=None):
+        """Drop cached entries (all of them when no names are given)
+
+        Probes already in flight are detached, so later callers start a new
+        one instead of waiting for a result from before the change.
+        """
+        with self._lock:
+            self._generation += 1
+            if service_names is None:
+                self._entries.clear()
+                self._probes.clear()
+            else:
+                for name in service_names:
+                    self._entries.pop(name, None)
+                    self._probes.pop(name, None)
+
+
+service_status_cache = ServiceStatusCache()
+
+
+def get_cached_service_statuses(service_names, max_age=None):
+    """Get service statuses, probing only those older than ``max_age`` seconds"""
+    statuses = service_status_cache.get(service_names, max_age)
+    return {
+        name: dict(details, last_checked=datetime.utcfromtimestamp(details['checked_at']).isoformat())
+        for name, details in statuses.items()
+    }
+
+
+def invalidate_service_statuses(service_names=None):
+    """Forget cached statuses, e.g. after a service was started or stopped"""
+    service_status_cache.invalidate(service_names)
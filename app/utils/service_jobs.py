@@ -0,0 +1,215 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from app.utils.system_info import control_service, ALLOWED_SERVICE_ACTIONS, SERVICE_NAME_PATTERN
+
+
+class _JobRun:
+    """In-process progress of a job, kept by the worker that runs it"""
+
+    def __init__(self, job_id, action, stages, audit):
+        self.job_id = job_id
+        self.action = action
+        self.stages = stages
+        self.audit = audit
+        self.stage = 0
+        self.remaining = 0
+        self.failed = False
+        self.lock = threading.Lock()
+
+
+class ServiceJobManager:
+    """Runs bulk ``systemctl`` actions on a bounded thread pool.
+
+    A job is a list of stages: services within a stage run in parallel, and
+    stages run one after another so dependencies can be started first. If any
+    action in a stage fails, later stages are skipped. Every action is written
+    to the audit log as it finishes.
+
+    Jobs live in the ``ServiceJob`` and ``ServiceJobResult`` tables: the
+    worker that accepted a job runs it and records its progress there, and
+    any worker can answer a status poll. Only the pool threads run actions;
+    when the last action of a stage finishes, its callback queues the next
+    stage, so no thread sits waiting for a job.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.max_workers = 4
+        self.max_jobs = 100
+        self._executor = None
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.max_workers = app.config.get('SERVICE_JOB_WORKERS', self.max_workers)
+        self.max_jobs = app.config.get('SERVICE_JOB_HISTORY', self.max_jobs)
+        app.extensions['service_job_manager'] = self
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='service-job')
+            return self._executor
+
+    def submit(self, action, services=None, stages=None, sequential=False, **audit):
+        """Queue a bulk action and return the job id immediately.
+
+        Pass either ``services`` (run in parallel, or one at a time in the given
+        order when ``sequential``) or explicit ``stages`` (list of lists).
+        ``audit`` carries user_id, username, ip_address and user_agent for the
+        audit log entries. Raises ValueError for invalid input.
+        """
+        from app.models import ServiceJob, ServiceJobResult
+
+        if action not in ALLOWED_SERVICE_ACTIONS:
+            raise ValueError(f'Action {action} not allowed')
+
+        if stages is None:
+            services = services or []
+            if not isinstance(services, list):
+                raise ValueError('services must be a list of service names')
+            stages = [[name] for name in services] if sequential else [services]
+        if not isinstance(stages, list) or not all(isinstance(stage, list) for stage in stages):
+            raise ValueError('stages must be a list of service name lists')
+        stages = [list(stage) for stage in stages if stage]
+
+        names = [name for stage in stages for name in stage]
+        if not names:
+            raise ValueError('No services given')
+        if len(set(names)) != len(names):
+            raise ValueError('A service may only appear once per job')
+        for name in names:
+            if not isinstance(name, str) or not SERVICE_NAME_PATTERN.match(name) or name.startswith('-'):
+                raise ValueError(f'Invalid service name: {name}')
+
+        run = _JobRun(uuid.uuid4().hex, action, stages, audit)
+
+        def create(session):
+            session.add(ServiceJob(
+                id=run.job_id,
+                action=action,
+                user_id=audit.get('user_id'),
+                results=[
+                    ServiceJobResult(stage=index, service_name=name)
+                    for index, stage in enumerate(stages)
+                    for name in stage
+                ]
+            ))
+            self._prune(session)
+
+        self._write(create)
+        self._start_stage(run)
+        return run.job_id
+
+    def get(self, job_id):
+        """The ``ServiceJob`` with this id, whichever worker runs it, or None"""
+        from app import db
+        from app.models import ServiceJob
+
+        return db.session.get(ServiceJob, job_id)
+
+    def _write(self, func):
+        """Run ``func(session)`` in a transaction of its own"""
+        from app import db
+
+        with self.app.app_context():
+            try:
+                func(db.session)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+
+    def _prune(self, session):
+        # Drop finished jobs beyond the newest max_jobs
+        from app.models import ServiceJob
+
+        for job in ServiceJob.query.order_by(ServiceJob.created_at.desc()).offset(self.max_jobs):
+            if job.finished:
+                session.delete(job)
+
+    def _start_stage(self, run):
+        stage = run.stages[run.stage]
+        run.remaining = len(stage)
+        for name in stage:
+            future = self.executor.submit(self._run_action, run, name)
+            future.add_done_callback(lambda done: self._action_done(run, done))
+
+    def _action_done(self, run, future):
+        with run.lock:
+            run.remaining -= 1
+            if future.exception() is not None or not future.result():
+                run.failed = True
+            if run.remaining:
+                return
+
+        try:
+            if run.failed or run.stage + 1 == len(run.stages):
+                self._finish(run)
+            else:
+                run.stage += 1
+                self._start_stage(run)
+        except Exception:
+            self.app.logger.exception('Service job %s could not continue', run.job_id)
+
+    def _finish(self, run):
+        from app.models import ServiceJob, ServiceJobResult
+
+        def finish(session):
+            ServiceJobResult.query.filter_by(job_id=run.job_id, state='pending').update({'state': 'skipped'})
+            ServiceJob.query.filter_by(id=run.job_id).update({
+                'status': 'failed' if run.failed else 'completed',
+                'finished_at': datetime.utcnow()
+            })
+
+        self._write(finish)
+
+    def _run_action(self, run, service_name):
+        from app.models import AuditLog, ServiceJob, ServiceJobResult
+        from app.utils.service_cache import invalidate_service_statuses
+
+        def start(session):
+            ServiceJob.query.filter_by(id=run.job_id, status='pending').update({'status': 'running'})
+            ServiceJobResult.query.filter_by(job_id=run.job_id, service_name=service_name).update({
+                'state': 'running',
+                'started_at': datetime.utcnow()
+            })
+
+        self._write(start)
+
+        try:
+            outcome = control_service(service_name, run.action)
+        except Exception as e:
+            outcome = {'success': False, 'error': str(e)}
+        invalidate_service_statuses([service_name])
+
+        def record(session):
+            ServiceJobResult.query.filter_by(job_id=run.job_id, service_name=service_name).update({
+                'state': 'succeeded' if outcome['success'] else 'failed',
+                'finished_at': datetime.utcnow(),
+                'output': outcome.get('output') if outcome['success'] else None,
+                'error': None if outcome['success'] else outcome.get('error')
+            })
+            session.add(AuditLog(
+                action='SERVICE_CONTROL',
+                description=f'User {run.audit.get("username")} performed {run.action} on {service_name} '
+                            f'(job {run.job_id[:8]}): {"succeeded" if outcome["success"] else "failed"}',
+                ip_address=run.audit.get('ip_address'),
+                user_agent=run.audit.get('user_agent'),
+                user_id=run.audit.get('user_id')
+            ))
+
+        self._write(record)
+        return outcome['success']
+
+
+service_job_manager = ServiceJobManager()
@@ -0,0 +1,36 @@
+import re
+
+from sqlalchemy import event
+
+PRAGMA_NAME = re.compile(r'^[a-z_]+$')
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas):
+    """Run ``PRAGMA name = value`` for each entry on a raw sqlite3 connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            if not PRAGMA_NAME.match(name):
+                raise ValueError(f'Invalid SQLite pragma: {name}')
+            cursor.execute(f'PRAGMA {name} = {value}')
+    finally:
+        cursor.close()
+
+
+def tune_sqlite_engine(engine, pragmas):
+    """Apply ``pragmas`` to every connection ``engine`` opens (other databases are left alone)"""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return False
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, pragmas)
+
+    return True
+
+
+def init_app(app):
+    from app import db
+
+    with app.app_context():
+        tune_sqlite_engine(db.engine, app.config.get('SQLITE_PRAGMAS'))
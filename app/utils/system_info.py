@@ -1,80 +1,416 @@
 import psutil
 import subprocess
 import socket
-import requests
-from datetime import datetime, timedelta
+from datetime import timedelta
+import functools
 import os
 import platform
+import re
+import threading
+import time
 
-def get_system_info():
-    """Get comprehensive system information"""
+from app.utils.public_ip import public_ip_resolver
+
+# Static facts never change while the process runs, slow facts are refreshed
+# on a long TTL and hot counters are read on every sample.
+SLOW_FACTS_TTL = 300  # seconds
+
+def cached_fact(ttl=None):
+    """Cache a zero-argument collector for ``ttl`` seconds (forever when None)"""
+    def decorator(func):
+        state = {}
+        lock = threading.Lock()
+        
+        @functools.wraps(func)
+        def wrapper():
+            with lock:
+                now = time.monotonic()
+                if 'value' not in state or (ttl is not None and now - state['at'] >= ttl):
+                    state['value'] = func()
+                    state['at'] = now
+                return state['value']
+        
+        wrapper.cache_clear = state.clear
+        return wrapper
+    return decorator
+
+@cached_fact()
+def get_static_info():
+    """Facts gathered once per worker process"""
+    return {
+        'cpu_count': psutil.cpu_count(),
+        'boot_time': psutil.boot_time(),
+        'hostname': socket.gethostname(),
+        'platform': platform.platform(),
+        'architecture': platform.architecture()[0],
+        'processor': platform.processor()
+    }
+
+@cached_fact(ttl=SLOW_FACTS_TTL)
+def get_private_ip():
+    """Private IP of this host, refreshed every ``SLOW_FACTS_TTL`` seconds"""
     try:
-        # CPU information
-        cpu_percent = psutil.cpu_percent(interval=1)
-        cpu_count = psutil.cpu_count()
+        return socket.gethostbyname(get_static_info()['hostname'])
+    except:
+        return "Unable to get IP"
+
+@cached_fact(ttl=SLOW_FACTS_TTL)
+def get_disk_partitions():
+    """Mounted partitions, refreshed every ``SLOW_FACTS_TTL`` seconds"""
+    return psutil.disk_partitions()
+
+def _collect_static():
+    static = get_static_info()
+    return {
+        'cpu_count': static['cpu_count'],
+        'hostname': static['hostname'],
+        'platform': static['platform'],
+        'architecture': static['architecture'],
+        'processor': static['processor']
+    }
+
+def _collect_addresses():
+    return {
+        'public_ip': public_ip_resolver.get(),  # Resolved in the background
+        'private_ip': get_private_ip()
+    }
+
+def _memory_fields(total, used, available, percent):
+    return {
+        'memory_percent': round(percent, 2),
+        'memory_total': round(total / (1024**3), 2),  # GB
+        'memory_used': round(used / (1024**3), 2),   # GB
+        'memory_available': round(available / (1024**3), 2)  # GB
+    }
+
+def _swap_fields(total, percent):
+    return {
+        'swap_percent': round(percent, 2),
+        'swap_total': round(total / (1024**3), 2)     # GB
+    }
+
+def _disk_fields(total, used, free, percent):
+    return {
+        'disk_percent': round(percent, 2),
+        'disk_total': round(total / (1024**3), 2),     # GB
+        'disk_used': round(used / (1024**3), 2),       # GB
+        'disk_free': round(free / (1024**3), 2)        # GB
+    }
+
+def _network_fields(bytes_sent, bytes_recv, packets_sent, packets_recv):
+    return {
+        'network_bytes_sent': bytes_sent,
+        'network_bytes_recv': bytes_recv,
+        'network_packets_sent': packets_sent,
+        'network_packets_recv': packets_recv
+    }
+
+def _load_fields(load_avg):
+    return {'load_average': f"{load_avg[0]:.2f}, {load_avg[1]:.2f}, {load_avg[2]:.2f}"}
+
+class PsutilBackend:
+    """Hot counters read through psutil (portable default)"""
+    
+    name = 'psutil'
+    
+    def cpu(self, cpu_interval):
+        cpu_percent = psutil.cpu_percent(interval=cpu_interval)
         cpu_freq = psutil.cpu_freq()
-        
-        # Memory information
+        return {
+            'cpu_percent': round(cpu_percent, 2),
+            'cpu_freq': round(cpu_freq.current, 2) if cpu_freq else 0
+        }
+    
+    def memory(self):
         memory = psutil.virtual_memory()
+        return _memory_fields(memory.total, memory.used, memory.available, memory.percent)
+    
+    def swap(self):
         swap = psutil.swap_memory()
-        
-        # Disk information
+        return _swap_fields(swap.total, swap.percent)
+    
+    def disk(self):
         disk = psutil.disk_usage('/')
-        disk_io = psutil.disk_io_counters()
-        
-        # Network information
+        return _disk_fields(disk.total, disk.used, disk.free, disk.percent)
+    
+    def network(self):
         network_io = psutil.net_io_counters()
-        
-        # System information
-        boot_time = psutil.boot_time()
-        uptime = str(timedelta(seconds=int(datetime.now().timestamp() - boot_time)))
-        
-        # Get IP addresses
-        hostname = socket.gethostname()
-        try:
-            private_ip = socket.gethostbyname(hostname)
-        except:
-            private_ip = "Unable to get IP"
-        
-        try:
-            public_ip = requests.get("https://api.ipify.org", timeout=5).text
-        except:
-            public_ip = "Unable to get public IP"
-        
+        if not network_io:
+            return _network_fields(0, 0, 0, 0)
+        return _network_fields(network_io.bytes_sent, network_io.bytes_recv,
+                               network_io.packets_sent, network_io.packets_recv)
+    
+    def uptime(self):
+        boot_time = get_static_info()['boot_time']
+        return {'uptime': str(timedelta(seconds=int(time.time() - boot_time)))}
+    
+    def load(self):
         # Load average (Linux/Unix only)
         try:
-            load_avg = os.getloadavg()
-            load_average = f"{load_avg[0]:.2f}, {load_avg[1]:.2f}, {load_avg[2]:.2f}"
+            return _load_fields(os.getloadavg())
         except:
-            load_average = "N/A"
+            return {'load_average': "N/A"}
+    
+    def close(self):
+        pass
+
+class ProcfsBackend:
+    """Hot counters parsed straight from /proc (Linux only)
+
+    Each /proc file is opened once and kept open; every sample seeks back to
+    the start and reads into a reusable buffer, then parses only the fields
+    the dashboard shows. ``proc_root`` can point at a directory of fixture
+    files so the parser works without a real /proc.
+    """
+    
+    name = 'procfs'
+    
+    MEMINFO_KEYS = (b'MemTotal', b'MemFree', b'MemAvailable', b'Buffers',
+                    b'Cached', b'SReclaimable', b'SwapTotal', b'SwapFree')
+    
+    def __init__(self, proc_root='/proc', disk_path='/'):
+        self.proc_root = proc_root
+        self.disk_path = disk_path
+        self._handles = {}
+        self._buffers = {}
+        self._last_cpu_times = None
+        self._cpu_freq_value = None
+        self._lock = threading.Lock()
+    
+    def _read(self, name):
+        """Re-read a /proc file through its persistent handle"""
+        with self._lock:
+            handle = self._handles.get(name)
+            if handle is None:
+                handle = open(os.path.join(self.proc_root, name), 'rb', buffering=0)
+                self._handles[name] = handle
+                self._buffers[name] = bytearray(4096)
+            
+            buffer = self._buffers[name]
+            handle.seek(0)
+            size = 0
+            while True:
+                with memoryview(buffer) as view:
+                    count = handle.readinto(view[size:])
+                if not count:
+                    break
+                size += count
+                if size == len(buffer):
+                    buffer.extend(bytes(len(buffer)))
+            return bytes(buffer[:size])
+    
+    def _cpu_times(self):
+        # First line of /proc/stat: cpu user nice system idle iowait irq softirq steal ...
+        data = self._read('stat')
+        fields = [int(value) for value in data[:data.index(b'\n')].split()[1:9]]
+        idle = fields[3] + fields[4]
+        return sum(fields), idle
+    
+    def _cpu_percent(self, cpu_interval):
+        if cpu_interval:
+            self._last_cpu_times = self._cpu_times()
+            time.sleep(cpu_interval)
+        
+        total, idle = self._cpu_times()
+        last = self._last_cpu_times
+        self._last_cpu_times = (total, idle)
         
+        if last is None or total <= last[0]:
+            return 0.0
+        busy = (total - last[0]) - (idle - last[1])
+        return round(max(busy, 0) / (total - last[0]) * 100, 1)
+    
+    def _cpu_freq(self):
+        # cpuinfo is static for the life of the process: parse it once
+        if self._cpu_freq_value is None:
+            with open(os.path.join(self.proc_root, 'cpuinfo'), 'rb') as f:
+                speeds = [float(line.split(b':', 1)[1])
+                          for line in f.read().splitlines()
+                          if line.startswith(b'cpu MHz')]
+            self._cpu_freq_value = sum(speeds) / len(speeds) if speeds else 0
+        return self._cpu_freq_value
+    
+    def _meminfo(self):
+        values = {}
+        for line in self._read('meminfo').splitlines():
+            key, _, rest = line.partition(b':')
+            if key in self.MEMINFO_KEYS:
+                values[key] = int(rest.split()[0]) * 1024
+                if len(values) == len(self.MEMINFO_KEYS):
+                    break
+        return values
+    
+    def cpu(self, cpu_interval):
         return {
-            'cpu_percent': round(cpu_percent, 2),
-            'cpu_count': cpu_count,
-            'cpu_freq': round(cpu_freq.current, 2) if cpu_freq else 0,
-            'memory_percent': round(memory.percent, 2),
-            'memory_total': round(memory.total / (1024**3), 2),  # GB
-            'memory_used': round(memory.used / (1024**3), 2),   # GB
-            'memory_available': round(memory.available / (1024**3), 2),  # GB
-            'swap_percent': round(swap.percent, 2),
-            'swap_total': round(swap.total / (1024**3), 2),     # GB
-            'disk_percent': round(disk.percent, 2),
-            'disk_total': round(disk.total / (1024**3), 2),     # GB
-            'disk_used': round(disk.used / (1024**3), 2),       # GB
-            'disk_free': round(disk.free / (1024**3), 2),       # GB
-            'network_bytes_sent': network_io.bytes_sent if network_io else 0,
-            'network_bytes_recv': network_io.bytes_recv if network_io else 0,
-            'network_packets_sent': network_io.packets_sent if network_io else 0,
-            'network_packets_recv': network_io.packets_recv if network_io else 0,
-            'public_ip': public_ip,
-            'private_ip': private_ip,
-            'hostname': hostname,
-            'uptime': uptime,
-            'load_average': load_average,
-            'platform': platform.platform(),
-            'architecture': platform.architecture()[0],
-            'processor': platform.processor()
+            'cpu_percent': round(self._cpu_percent(cpu_interval), 2),
+            'cpu_freq': round(self._cpu_freq(), 2)
         }
+    
+    def memory(self):
+        values = self._meminfo()
+        total = values.get(b'MemTotal', 0)
+        free = values.get(b'MemFree', 0)
+        cached = values.get(b'Cached', 0) + values.get(b'SReclaimable', 0)
+        available = values.get(b'MemAvailable', free + cached)
+        used = total - free - cached - values.get(b'Buffers', 0)
+        if used < 0:
+            used = total - free
+        percent = (total - available) / total * 100 if total else 0
+        return _memory_fields(total, used, available, round(percent, 1))
+    
+    def swap(self):
+        values = self._meminfo()
+        total = values.get(b'SwapTotal', 0)
+        used = total - values.get(b'SwapFree', 0)
+        percent = used / total * 100 if total else 0
+        return _swap_fields(total, round(percent, 1))
+    
+    def disk(self):
+        stats = os.statvfs(self.disk_path)
+        total = stats.f_blocks * stats.f_frsize
+        used = total - stats.f_bfree * stats.f_frsize
+        free = stats.f_bavail * stats.f_frsize
+        percent = used / (used + free) * 100 if used + free else 0
+        return _disk_fields(total, used, free, round(percent, 1))
+    
+    def network(self):
+        bytes_sent = bytes_recv = packets_sent = packets_recv = 0
+        # Two header lines, then "iface: rx_bytes rx_packets ... tx_bytes tx_packets ..."
+        for line in self._read('net/dev').splitlines()[2:]:
+            fields = line.partition(b':')[2].split()
+            bytes_recv += int(fields[0])
+            packets_recv += int(fields[1])
+            bytes_sent += int(fields[8])
+            packets_sent += int(fields[9])
+        return _network_fields(bytes_sent, bytes_recv, packets_sent, packets_recv)
+    
+    def uptime(self):
+        seconds = float(self._read('uptime').split()[0])
+        return {'uptime': str(timedelta(seconds=int(seconds)))}
+    
+    def load(self):
+        return _load_fields([float(value) for value in self._read('loadavg').split()[:3]])
+    
+    def close(self):
+        with self._lock:
+            for handle in self._handles.values():
+                handle.close()
+            self._handles.clear()
+            self._buffers.clear()
+
+HOT_BACKENDS = {
+    'psutil': PsutilBackend,
+    'procfs': ProcfsBackend
+}
+
+hot_backend = PsutilBackend()
+
+def set_hot_backend(name, **options):
+    """Select the backend used for hot counters (``psutil`` or ``procfs``)"""
+    global hot_backend
+    
+    if name not in HOT_BACKENDS:
+        raise ValueError(f'Unknown system info backend: {name}')
+    
+    previous = hot_backend
+    if name == 'procfs':
+        hot_backend = ProcfsBackend(**options)
+    else:
+        hot_backend = HOT_BACKENDS[name]()
+    previous.close()
+    return hot_backend
+
+# Fields produced by each collector. Hot collectors are methods of the
+# backend; 'addresses' and 'static' come from the cached tiers above.
+SYSTEM_INFO_COLLECTORS = {
+    'cpu': ('cpu_percent', 'cpu_freq'),
+    'memory': ('memory_percent', 'memory_total', 'memory_used', 'memory_available'),
+    'swap': ('swap_percent', 'swap_total'),
+    'disk': ('disk_percent', 'disk_total', 'disk_used', 'disk_free'),
+    'network': ('network_bytes_sent', 'network_bytes_recv', 'network_packets_sent', 'network_packets_recv'),
+    'uptime': ('uptime',),
+    'load': ('load_average',),
+    'addresses': ('public_ip', 'private_ip'),
+    'static': ('cpu_count', 'hostname', 'platform', 'architecture', 'processor')
+}
+
+SYSTEM_INFO_FIELDS = {
+    field: collector
+    for collector, fields in SYSTEM_INFO_COLLECTORS.items()
+    for field in fields
+}
+
+# Named field sets for clients that poll the same subset over and over
+SYSTEM_INFO_PROFILES = {
+    'dashboard': ('cpu_percent', 'memory_percent', 'disk_percent', 'uptime',
+                  'public_ip', 'private_ip', 'hostname'),
+    'widget': ('cpu_percent', 'memory_percent', 'disk_percent'),
+    'full': tuple(SYSTEM_INFO_FIELDS)
+}
+
+def resolve_system_info_fields(fields=None, profile=None):
+    """Turn a ``?fields=a,b`` string and/or profile name into a field list
+
+    Returns None when neither is given (meaning every field). Raises
+    ValueError for unknown fields or profiles.
+    """
+    if not fields and not profile:
+        return None
+    
+    selected = []
+    if profile:
+        if profile not in SYSTEM_INFO_PROFILES:
+            raise ValueError(f'Unknown profile: {profile}')
+        selected.extend(SYSTEM_INFO_PROFILES[profile])
+    
+    if fields:
+        for field in fields.split(','):
+            field = field.strip()
+            if not field:
+                continue
+            if field not in SYSTEM_INFO_FIELDS:
+                raise ValueError(f'Unknown field: {field}')
+            if field not in selected:
+                selected.append(field)
+    
+    return selected
+
+def _run_collector(name, backend, cpu_interval):
+    if name == 'cpu':
+        return backend.cpu(cpu_interval)
+    if name == 'addresses':
+        return _collect_addresses()
+    if name == 'static':
+        return _collect_static()
+    return getattr(backend, name)()
+
+def get_system_info(cpu_interval=None, backend=None, fields=None):
+    """Get comprehensive system information
+
+    ``cpu_interval`` is the CPU measurement window in seconds, as for
+    ``psutil.cpu_percent``. The default ``None`` does not block: the value
+    covers the time since the previous call. Hot counters come from ``backend`` (default: the configured one).
+    When ``fields`` is given only the collectors producing those fields run
+    and only those fields are returned.
+    """
+    backend = backend or hot_backend
+    try:
+        if fields is None:
+            collectors = list(SYSTEM_INFO_COLLECTORS)
+        else:
+            collectors = []
+            for field in fields:
+                collector = SYSTEM_INFO_FIELDS[field]
+                if collector not in collectors:
+                    collectors.append(collector)
+        
+        info = {}
+        for name in collectors:
+            info.update(_run_collector(name, backend, cpu_interval))
+        
+        if fields is not None:
+            info = {field: info[field] for field in fields}
+        return info
     except Exception as e:
         return {
             'error': f'Failed to get system info: {str(e)}',
@@ -87,47 +423,95 @@ def get_system_info():
             'uptime': 'Error'
         }
 
-def get_service_status(service_name):
-    """Get the status of a systemd service"""
-    try:
-        # Check if service is active
-        result = subprocess.run(
-            ['systemctl', 'is-active', service_name],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-        
-        if result.returncode == 0:
-            return "active"
+# Unit names as accepted by systemd; also keeps names from being read as options
+SERVICE_NAME_PATTERN = re.compile(r'^[A-Za-z0-9@_:.\-]+$')
+SERVICE_PROPERTIES = ('Id', 'LoadState', 'ActiveState', 'SubState', 'UnitFileState')
+SYSTEMCTL_SHOW_TIMEOUT = 10  # seconds
+
+def _parse_systemctl_show(output):
+    """Split ``systemctl show`` output into one property dict per unit"""
+    units = []
+    for block in output.strip().split('\n\n'):
+        properties = {}
+        for line in block.splitlines():
+            key, sep, value = line.partition('=')
+            if sep:
+                properties[key] = value
+        if properties:
+            units.append(properties)
+    return units
+
+def _service_state(properties):
+    """Reduce systemd unit properties to the dashboard's status vocabulary"""
+    active_state = properties.get('ActiveState', '')
+    
+    if active_state in ('active', 'reloading'):
+        return "active"
+    if properties.get('LoadState') == 'not-found':
+        return "not-found"
+    if active_state in ('inactive', 'failed', 'activating', 'deactivating'):
+        return active_state
+    return "unknown"
+
+def get_service_statuses(service_names):
+    """Get the status of several systemd services with one ``systemctl show`` call
+
+    Returns a dict keyed by service name (in request order) with ``status``
+    plus the raw ``load_state``, ``active_state``, ``sub_state`` and
+    ``unit_file_state`` properties.
+    """
+    names = list(dict.fromkeys(service_names))
+    results = {}
+    
+    valid_names = []
+    for name in names:
+        if SERVICE_NAME_PATTERN.match(name) and not name.startswith('-'):
+            valid_names.append(name)
         else:
-            # Check if service exists but is inactive
+            results[name] = {'status': "error: invalid service name"}
+    
+    if valid_names:
+        try:
             result = subprocess.run(
-                ['systemctl', 'status', service_name],
+                ['systemctl', 'show', '--no-pager',
+                 '--property=' + ','.join(SERVICE_PROPERTIES)] + valid_names,
                 capture_output=True,
                 text=True,
-                timeout=10
+                timeout=SYSTEMCTL_SHOW_TIMEOUT
             )
+            units = _parse_systemctl_show(result.stdout)
             
-            if 'could not be found' in result.stderr.lower():
-                return "not-found"
-            elif 'inactive' in result.stdout.lower():
-                return "inactive"
-            elif 'failed' in result.stdout.lower():
-                return "failed"
-            else:
-                return "unknown"
-                
-    except subprocess.TimeoutExpired:
-        return "timeout"
-    except Exception as e:
-        return f"error: {str(e)}"
+            # systemctl prints one block per requested unit, in order
+            if len(units) != len(valid_names):
+                units = [{}] * len(valid_names)
+            
+            for name, properties in zip(valid_names, units):
+                results[name] = {
+                    'status': _service_state(properties),
+                    'load_state': properties.get('LoadState'),
+                    'active_state': properties.get('ActiveState'),
+                    'sub_state': properties.get('SubState'),
+                    'unit_file_state': properties.get('UnitFileState')
+                }
+        
+        except subprocess.TimeoutExpired:
+            for name in valid_names:
+                results[name] = {'status': "timeout"}
+        except Exception as e:
+            for name in valid_names:
+                results[name] = {'status': f"error: {str(e)}"}
+    
+    return {name: results[name] for name in names}
+
+def get_service_status(service_name):
+    """Get the status of a systemd service"""
+    return get_service_statuses([service_name])[service_name]['status']
+
+ALLOWED_SERVICE_ACTIONS = ['start', 'stop', 'restart', 'enable', 'disable', 'reload']
 
 def control_service(service_name, action):
     """Control a systemd service (start, stop, restart, enable, disable)"""
-    allowed_actions = ['start', 'stop', 'restart', 'enable', 'disable', 'reload']
-    
-    if action not in allowed_actions:
+    if action not in ALLOWED_SERVICE_ACTIONS:
         return {'success': False, 'error': f'Action {action} not allowed'}
     
     try:
@@ -208,7 +592,7 @@ def get_disk_usage():
     try:
         disk_usage = []
         
-        for partition in psutil.disk_partitions():
+        for partition in get_disk_partitions():
             try:
                 usage = psutil.disk_usage(partition.mountpoint)
                 disk_usage.append({
@@ -0,0 +1,54 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+# Dialects with INSERT ... ON CONFLICT; others fall back to savepoints
+CONFLICT_INSERTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert
+}
+
+
+def _conflict_insert(session):
+    return CONFLICT_INSERTS.get(session.get_bind().dialect.name)
+
+
+def _insert_in_savepoint(session, table, row):
+    # False when a unique constraint rejected the row
+    try:
+        with session.begin_nested():
+            session.execute(table.insert().values(row))
+    except IntegrityError:
+        return False
+    return True
+
+
+def insert_ignoring_conflict(session, table, row, key):
+    """Insert ``row`` unless a row with the same unique ``key`` exists; returns 1 or 0"""
+    insert = _conflict_insert(session)
+    if insert is not None:
+        statement = insert(table).values(row).on_conflict_do_nothing(index_elements=[key])
+        return session.execute(statement).rowcount
+    return int(_insert_in_savepoint(session, table, row))
+
+
+def upsert(session, table, rows, key, columns):
+    """Insert ``rows``, updating ``columns`` of those whose unique ``key`` already exists"""
+    if not rows:
+        return
+    insert = _conflict_insert(session)
+    if insert is not None:
+        statement = insert(table).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[key],
+            set_={name: statement.excluded[name] for name in columns}
+        )
+        session.execute(statement)
+        return
+
+    for row in rows:
+        update = table.update().where(table.c[key] == row[key]).values({name: row[name] for name in columns})
+        if session.execute(update).rowcount:
+            continue
+        if not _insert_in_savepoint(session, table, row):
+            # Inserted by another writer in the meantime
+            session.execute(update)
@@ -0,0 +1,256 @@
+import atexit
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from app.utils.upserts import insert_ignoring_conflict
+
+
+class WriteBehindWriter:
+    """Batches ServiceStatus and SystemMetrics writes off the request path.
+
+    Producers only append observations to an in-memory queue. One
+    writer thread per worker flushes the queue in a single transaction every
+    ``interval`` seconds, or sooner once ``batch_size`` items are waiting.
+    Service status observations are coalesced: only the newest one per
+    service is kept, and it is skipped entirely when the status is unchanged
+    and the row was refreshed less than ``heartbeat`` seconds ago.
+
+    A failed flush puts its batch back. After ``max_retries`` failures in a
+    row the batch is bisected so the rows that can be written are, and the
+    ones that still fail on their own are logged, counted as ``dropped`` and
+    discarded instead of blocking every later flush.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = True
+        self.interval = 2
+        self.batch_size = 100
+        self.heartbeat = 60
+        self.max_retries = 3
+        self._failed_flushes = 0
+        self._queue = deque()
+        self._wakeup = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._written_services = {}
+        self._stats = {
+            'enqueued': 0,
+            'flushes': 0,
+            'rows_written': 0,
+            'coalesced': 0,
+            'errors': 0,
+            'dropped': 0,
+            'max_queue_depth': 0,
+            'last_flush_at': None,
+            'last_flush_latency_ms': None,
+            'max_flush_latency_ms': None,
+            'total_flush_latency_ms': 0.0
+        }
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('WRITE_BEHIND_ENABLED', True)
+        self.interval = app.config.get('WRITE_BEHIND_INTERVAL', self.interval)
+        self.batch_size = app.config.get('WRITE_BEHIND_BATCH_SIZE', self.batch_size)
+        self.heartbeat = app.config.get('WRITE_BEHIND_HEARTBEAT', self.heartbeat)
+        self.max_retries = app.config.get('WRITE_BEHIND_MAX_RETRIES', self.max_retries)
+        app.extensions['write_behind'] = self
+
+        if self.enabled:
+            self.start()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout=5):
+        """Stop the writer thread after a final flush"""
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+        self.flush()
+
+    def _enqueue(self, item):
+        self._queue.append(item)
+        self._stats['enqueued'] += 1
+        depth = len(self._queue)
+        if depth > self._stats['max_queue_depth']:
+            self._stats['max_queue_depth'] = depth
+
+        if not self.enabled:
+            self.flush()
+        elif depth >= self.batch_size:
+            self._wakeup.set()
+
+    def record_metrics(self, info, timestamp=None):
+        """Queue a SystemMetrics row built from a system info snapshot
+
+        Rows are keyed by ``timestamp``; one whose timestamp already exists
+        in the table is dropped, which keeps bucketed samples unique.
+        """
+        self._enqueue(('metrics', {
+            'timestamp': timestamp or datetime.utcnow(),
+            'cpu_percent': info['cpu_percent'],
+            'memory_percent': info['memory_percent'],
+            'disk_percent': info['disk_percent'],
+            'network_bytes_sent': info.get('network_bytes_sent', 0),
+            'network_bytes_recv': info.get('network_bytes_recv', 0),
+            'load_average': info.get('load_average', '')
+        }))
+
+    def record_service_status(self, service_name, status, checked_at):
+        """Queue a ServiceStatus observation (``checked_at`` is a naive UTC datetime)"""
+        self._enqueue(('service_status', (service_name, status, checked_at)))
+
+    def flush(self):
+        """Write everything queued so far in one transaction"""
+        with self._flush_lock:
+            items = []
+            while self._queue:
+                items.append(self._queue.popleft())
+            if not items:
+                return 0
+
+            started = time.perf_counter()
+            rows = [(kind, payload) for kind, payload in items if kind == 'metrics']
+
+            # Keep only the newest observation per service
+            latest = {}
+            for kind, payload in items:
+                if kind == 'service_status':
+                    name, status, checked_at = payload
+                    if name not in latest or checked_at > latest[name][1]:
+                        latest[name] = (status, checked_at)
+
+            for name, (status, checked_at) in latest.items():
+                written = self._written_services.get(name)
+                if written is not None and (
+                        checked_at <= written[1] or
+                        (status == written[0] and (checked_at - written[1]).total_seconds() < self.heartbeat)):
+                    continue
+                rows.append(('service_status', (name, status, checked_at)))
+            coalesced = len(items) - len(rows)
+
+            try:
+                written = self._write(rows)
+            except Exception:
+                self._stats['errors'] += 1
+                self._failed_flushes += 1
+                if self._failed_flushes < self.max_retries:
+                    # Put the batch back so it is retried on the next flush
+                    self._queue.extendleft(reversed(items))
+                    return 0
+                written, rows = self._write_isolating(rows)
+            self._failed_flushes = 0
+            self._stats['coalesced'] += coalesced
+
+            for kind, payload in rows:
+                if kind == 'service_status':
+                    name, status, checked_at = payload
+                    self._written_services[name] = (status, checked_at)
+
+            latency = (time.perf_counter() - started) * 1000
+            self._stats['flushes'] += 1
+            self._stats['rows_written'] += written
+            self._stats['last_flush_at'] = datetime.utcnow().isoformat()
+            self._stats['last_flush_latency_ms'] = round(latency, 3)
+            self._stats['max_flush_latency_ms'] = round(max(latency, self._stats['max_flush_latency_ms'] or 0), 3)
+            self._stats['total_flush_latency_ms'] += latency
+            return written
+
+    def _write_isolating(self, rows):
+        """Write ``rows`` in ever smaller batches, dropping the ones that fail alone
+
+        Returns the number of rows written and the rows that were kept.
+        """
+        try:
+            return self._write(rows), rows
+        except Exception as e:
+            if len(rows) == 1:
+                self._stats['dropped'] += 1
+                self.app.logger.error('Write-behind dropped %s row after %d failed flushes: %r (%s)',
+                                      rows[0][0], self._failed_flushes, rows[0][1], e)
+                return 0, []
+
+        middle = len(rows) // 2
+        written_first, kept_first = self._write_isolating(rows[:middle])
+        written_second, kept_second = self._write_isolating(rows[middle:])
+        return written_first + written_second, kept_first + kept_second
+
+    def _write(self, rows):
+        from app import db
+        from app.models import SystemMetrics, ServiceStatus
+        from app.utils.rollups import apply_sample
+
+        metrics = [payload for kind, payload in rows if kind == 'metrics']
+        services = {
+            payload[0]: payload[1:]
+            for kind, payload in rows
+            if kind == 'service_status'
+        }
+        if not metrics and not services:
+            return 0
+
+        with self.app.app_context():
+            try:
+                inserted = 0
+                for row in metrics:
+                    # system_metrics.timestamp is unique: every worker's collector
+                    # can offer the same bucket and the database keeps one row
+                    if insert_ignoring_conflict(db.session, SystemMetrics.__table__, row, 'timestamp'):
+                        # Only the worker whose row was kept updates the rollups
+                        apply_sample(row)
+                        inserted += 1
+
+                if services:
+                    existing = {
+                        service.service_name: service
+                        for service in ServiceStatus.query.filter(ServiceStatus.service_name.in_(list(services))).all()
+                    }
+                    for name, (status, checked_at) in services.items():
+                        service = existing.get(name)
+                        if not service:
+                            service = ServiceStatus(service_name=name)
+                            db.session.add(service)
+                        service.status = status
+                        service.last_checked = checked_at
+
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+
+        return inserted + len(services)
+
+    def get_stats(self):
+        stats = dict(self._stats)
+        stats['queue_depth'] = len(self._queue)
+        stats['running'] = self._thread is not None and self._thread.is_alive()
+        flushes = stats['flushes']
+        stats['avg_flush_latency_ms'] = round(stats.pop('total_flush_latency_ms') / flushes, 3) if flushes else None
+        return stats
+
+
+write_behind = WriteBehindWriter()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Concurrent-write benchmark of the default and production SQLite profiles
+
+Several processes stand in for gunicorn workers: writers insert
+SystemMetrics rows one transaction at a time while readers poll the table
+the way the dashboard does.
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.exc import OperationalError
+
+from app.models import SystemMetrics
+from app.utils.sqlite_tuning import tune_sqlite_engine
+from config import Config, ProductionConfig
+
+PROFILES = {
+    'default': (Config.SQLITE_PRAGMAS, {}),
+    'production': (ProductionConfig.SQLITE_PRAGMAS, ProductionConfig.SQLALCHEMY_ENGINE_OPTIONS)
+}
+
+def make_engine(url, profile):
+    pragmas, options = PROFILES[profile]
+    engine = create_engine(url, **options)
+    tune_sqlite_engine(engine, pragmas)
+    return engine
+
+def writer(url, profile, writes, results):
+    engine = make_engine(url, profile)
+    table = SystemMetrics.__table__
+    done = errors = 0
+    for _ in range(writes):
+        try:
+            with engine.begin() as connection:
+                connection.execute(insert(table).values(
+                    timestamp=datetime.utcnow(), cpu_percent=1.0, memory_percent=2.0, disk_percent=3.0,
+                    network_bytes_sent=0, network_bytes_recv=0, load_average='0.00 0.00 0.00'))
+            done += 1
+        except OperationalError:
+            errors += 1
+    results.put((done, errors))
+
+def reader(url, profile, stop):
+    engine = make_engine(url, profile)
+    table = SystemMetrics.__table__
+    while not stop.is_set():
+        try:
+            with engine.connect() as connection:
+                connection.execute(select(func.count(), func.avg(table.c.cpu_percent))).one()
+        except OperationalError:
+            pass
+
+def run(profile, args):
+    path = os.path.join(tempfile.mkdtemp(prefix='dashboard-bench-'), 'bench.db')
+    url = f'sqlite:///{path}'
+    engine = make_engine(url, profile)
+    SystemMetrics.__table__.create(engine)
+    engine.dispose()
+
+    results = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    readers = [multiprocessing.Process(target=reader, args=(url, profile, stop)) for _ in range(args.readers)]
+    writers = [multiprocessing.Process(target=writer, args=(url, profile, args.writes, results))
+               for _ in range(args.workers)]
+
+    for process in readers:
+        process.start()
+    started = time.perf_counter()
+    for process in writers:
+        process.start()
+    outcomes = [results.get() for _ in writers]
+    elapsed = time.perf_counter() - started
+    for process in writers:
+        process.join()
+    stop.set()
+    for process in readers:
+        process.join()
+    shutil.rmtree(os.path.dirname(path))
+
+    done = sum(outcome[0] for outcome in outcomes)
+    errors = sum(outcome[1] for outcome in outcomes)
+    print(f"  {profile:<12} {done / elapsed:10.1f} writes/s  {errors:5d} 'database is locked' errors  ({elapsed:.2f}s)")
+    return done / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4, help='Writer processes (gunicorn workers)')
+    parser.add_argument('--readers', type=int, default=2, help='Concurrently polling reader processes')
+    parser.add_argument('--writes', type=int, default=250, help='Transactions per writer')
+    args = parser.parse_args()
+
+    print(f"📊 SQLite write throughput ({args.workers} writers x {args.writes} commits, {args.readers} readers)")
+    default = run('default', args)
+    production = run('production', args)
+
+    print(f"\n⚡ production profile: {production / default:.1f}x writes/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the psutil and /proc system info backends
+"""
+import argparse
+import timeit
+
+from app.utils.system_info import PsutilBackend, ProcfsBackend, get_system_info
+
+def hot_sample(backend):
+    """Read only the per-tick counters (no static or slow facts)"""
+    backend.cpu(None)
+    backend.memory()
+    backend.swap()
+    backend.disk()
+    backend.network()
+    backend.uptime()
+    backend.load()
+
+def run(label, func, iterations):
+    func()  # Warm up caches and open file handles
+    best = min(timeit.repeat(func, number=iterations, repeat=5)) / iterations
+    print(f"  {label:<28} {best * 1e6:10.1f} µs/call")
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--proc-root', default='/proc', help='Alternative /proc tree (e.g. fixture files)')
+    args = parser.parse_args()
+
+    psutil_backend = PsutilBackend()
+    procfs_backend = ProcfsBackend(proc_root=args.proc_root)
+
+    print(f"📊 System info backends ({args.iterations} iterations, best of 5)")
+    print("Hot counters only:")
+    psutil_hot = run('psutil', lambda: hot_sample(psutil_backend), args.iterations)
+    procfs_hot = run('procfs', lambda: hot_sample(procfs_backend), args.iterations)
+
+    print("Full get_system_info():")
+    psutil_full = run('psutil', lambda: get_system_info(None, psutil_backend), args.iterations)
+    procfs_full = run('procfs', lambda: get_system_info(None, procfs_backend), args.iterations)
+
+    print(f"\n⚡ procfs speedup: {psutil_hot / procfs_hot:.1f}x hot, {psutil_full / procfs_full:.1f}x full")
+    procfs_backend.close()
+
+if __name__ == "__main__":
+    main()
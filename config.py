@@ -8,6 +8,7 @@ class Config:
     # Database settings
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///dashboard.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLITE_PRAGMAS = {}  # PRAGMA name -> value, run on every new SQLite connection
     
     # Upload settings
     UPLOAD_FOLDER = 'uploads'
@@ -25,6 +26,70 @@ class Config:
     # Security settings
     WTF_CSRF_ENABLED = True
     
+    # Metrics collector settings
+    METRICS_COLLECTOR_ENABLED = os.environ.get('METRICS_COLLECTOR_ENABLED', 'True').lower() in ['true', '1', 'yes']
+    METRICS_SAMPLE_INTERVAL = float(os.environ.get('METRICS_SAMPLE_INTERVAL', 5))  # seconds
+    METRICS_BUCKET_SECONDS = int(os.environ.get('METRICS_BUCKET_SECONDS', 60))  # one stored sample per bucket
+    METRICS_RAW_RETENTION_DAYS = int(os.environ.get('METRICS_RAW_RETENTION_DAYS', 2))
+    METRICS_ROLLUP_TIERS = ((60, 7), (900, 90), (3600, 730))  # (resolution seconds, retention days)
+    METRICS_COMPACTION_INTERVAL = 3600  # seconds between retention passes
+    METRICS_HISTORY_MAX_POINTS = 1000
+    SYSTEM_INFO_BACKEND = os.environ.get('SYSTEM_INFO_BACKEND', 'psutil')  # psutil or procfs
+    PROCFS_ROOT = os.environ.get('PROCFS_ROOT', '/proc')
+    
+    # Public IP lookup settings
+    PUBLIC_IP_ENDPOINT = os.environ.get('PUBLIC_IP_ENDPOINT', 'https://api.ipify.org')
+    PUBLIC_IP_TTL = int(os.environ.get('PUBLIC_IP_TTL', 600))  # seconds
+    PUBLIC_IP_FAILURE_TTL = int(os.environ.get('PUBLIC_IP_FAILURE_TTL', 60))  # seconds
+    PUBLIC_IP_TIMEOUT = 5  # seconds
+    
+    # Service status cache (seconds a systemctl probe result is reused)
+    SERVICE_STATUS_TTL = float(os.environ.get('SERVICE_STATUS_TTL', 5))
+    
+    # Bulk service actions run on this many threads per worker
+    SERVICE_JOB_WORKERS = int(os.environ.get('SERVICE_JOB_WORKERS', 4))
+    SERVICE_JOB_HISTORY = 100  # finished jobs kept for status polls
+    
+    # Write-behind persistence for polled metrics and service statuses
+    WRITE_BEHIND_ENABLED = True
+    WRITE_BEHIND_INTERVAL = float(os.environ.get('WRITE_BEHIND_INTERVAL', 2))  # seconds
+    WRITE_BEHIND_BATCH_SIZE = int(os.environ.get('WRITE_BEHIND_BATCH_SIZE', 100))
+    WRITE_BEHIND_HEARTBEAT = 60  # seconds an unchanged service status goes unwritten
+    WRITE_BEHIND_MAX_RETRIES = 3  # failed flushes before a batch is split and bad rows dropped
+    
+    # Response compression and static file caching
+    COMPRESS_MIN_SIZE = 500  # bytes; smaller responses are sent as they are
+    COMPRESS_LEVEL = 6
+    STATIC_MAX_AGE = 365 * 24 * 3600  # seconds, for fingerprinted static URLs
+    
+    # Directory sizes in the SMB browser are recomputed after this many seconds
+    # even when the directory's mtime is unchanged (changes deeper down)
+    DIRECTORY_SIZE_MAX_AGE = int(os.environ.get('DIRECTORY_SIZE_MAX_AGE', 3600))
+    
+    # Dashboard panels load concurrently; slower ones render as placeholders
+    PANEL_TIMEOUT = float(os.environ.get('PANEL_TIMEOUT', 0.5))  # seconds the page waits for its panels
+    PANEL_WORKERS = int(os.environ.get('PANEL_WORKERS', 4))
+    PANEL_API_TIMEOUT = float(os.environ.get('PANEL_API_TIMEOUT', 10))  # seconds the API waits to fill one in
+    
+    # Next-poll hints (X-Poll-Interval) for clients that poll the API
+    CHAT_POLL_INTERVAL = 3  # seconds; base cadence of chat polling without EventSource
+    POLL_MIN_INTERVAL = 2
+    POLL_MAX_INTERVAL = 300
+    POLL_MAX_LOAD_FACTOR = 4  # at most this many times the base interval under load
+    
+    # Chat push over Server-Sent Events
+    CHAT_STREAM_POLL_INTERVAL = float(os.environ.get('CHAT_STREAM_POLL_INTERVAL', 1))  # seconds between new-message checks
+    CHAT_STREAM_HEARTBEAT = 15  # seconds between keep-alive comments
+    CHAT_STREAM_MAX_DURATION = 300  # seconds before a stream closes and the browser reconnects
+    CHAT_STREAM_BACKLOG = 200  # recent messages kept for Last-Event-ID resumes
+    # Open streams (chat and dashboard) per worker; each holds a request
+    # thread, so keep this below gunicorn's --threads. Refused pages poll.
+    STREAM_MAX_PER_WORKER = int(os.environ.get('STREAM_MAX_PER_WORKER', 4))
+    
+    # Dashboard event stream (/api/stream): seconds between state checks
+    DASHBOARD_STREAM_SYSTEM_INTERVAL = 5
+    DASHBOARD_STREAM_SERVICE_INTERVAL = 10
+    
     # Service names
     OPENVPN_SERVICE = 'openvpn'
     SQUID_SERVICE = 'squid'
@@ -35,9 +100,32 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     DEBUG = False
     
+    # Several gunicorn workers write to one SQLite file: WAL lets readers and
+    # the single writer proceed together, and busy_timeout makes writers wait
+    # for the lock instead of failing with "database is locked".
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',  # durable in WAL mode except on power loss
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 15000)),  # ms
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -32000,  # KiB (negative) -> 32MB page cache per connection
+        'temp_store': 'MEMORY'
+    }
+    
+    # Per worker: request threads plus the collector, write-behind, chat hub
+    # and job threads (open chat streams do not hold a connection)
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 5,
+        'max_overflow': 10,
+        'pool_timeout': 30
+    }
+    
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    METRICS_COLLECTOR_ENABLED = False
+    WRITE_BEHIND_ENABLED = False
+    PUBLIC_IP_ENDPOINT = None
     
 config = {
     'development': DevelopmentConfig,
@@ -0,0 +1,23 @@
+"""
+Shared fixtures: the testing app with CSRF off and a client logged in as admin
+
+Modules that need a different database or seed data override ``app``.
+"""
+import pytest
+
+from app import create_app
+
+
+@pytest.fixture(scope='module')
+def app():
+    app = create_app('testing')
+    app.config['WTF_CSRF_ENABLED'] = False
+    return app
+
+
+@pytest.fixture(scope='module')
+def client(app):
+    client = app.test_client()
+    response = client.post('/auth/login', data={'username': 'admin', 'password': 'admin123'})
+    assert response.status_code == 302
+    return client
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Check incremental chat polling when a client missed more than one page
+"""
+import pytest
+
+from app import db
+from app.api.routes import CHAT_AFTER_LIMIT
+from app.models import ChatMessage, User
+
+MISSED = CHAT_AFTER_LIMIT + 50
+
+
+@pytest.fixture(scope='module')
+def app(app):
+    with app.app_context():
+        admin = User.query.filter_by(username='admin').one()
+        db.session.add_all(ChatMessage(content=f'message {n}', user_id=admin.id) for n in range(MISSED))
+        db.session.commit()
+    return app
+
+
+def test_poll_after_many_missed_messages_delivers_all(client):
+    received = []
+    etag = None
+
+    # Poll like the dashboard: after the last id seen, with the last ETag
+    for _ in range(3):
+        headers = {'If-None-Match': etag} if etag else {}
+        after_id = received[-1]['id'] if received else 0
+        response = client.get(f'/api/chat_messages?after_id={after_id}', headers=headers)
+        if response.status_code == 304:
+            break
+        received.extend(response.get_json())
+        etag = response.headers.get('ETag')
+
+    assert len(received) == MISSED
+    assert [message['id'] for message in received] == sorted({message['id'] for message in received})
+
+
+def test_truncated_page_has_no_chat_etag(client):
+    response = client.get('/api/chat_messages?after_id=0')
+    assert len(response.get_json()) == CHAT_AFTER_LIMIT
+    assert response.headers['X-Chat-Has-More'] == 'true'
+    assert 'chat-' not in response.headers.get('ETag', '')
+
+    last_id = response.get_json()[-1]['id']
+    rest = client.get(f'/api/chat_messages?after_id={last_id}')
+    assert len(rest.get_json()) == MISSED - CHAT_AFTER_LIMIT
+    assert rest.headers['X-Chat-Has-More'] == 'false'
+
+    caught_up = client.get(f'/api/chat_messages?after_id={rest.get_json()[-1]["id"]}',
+                           headers={'If-None-Match': rest.headers['ETag']})
+    assert caught_up.status_code == 304
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Check that system info never blocks a request: the background sampler, the
+snapshot age and the synchronous fallback when the sampler is not running
+"""
+import time
+from datetime import datetime
+
+import psutil
+import pytest
+
+from app.utils import collector as collector_module
+from app.utils.collector import MetricsCollector, get_system_snapshot
+from app.utils.system_info import get_system_info
+
+
+@pytest.fixture
+def samples(monkeypatch):
+    """Count the samples taken; each one reports its number as cpu_percent"""
+    taken = []
+
+    def fake_get_system_info(cpu_interval=None, fields=None):
+        assert cpu_interval is None
+        taken.append(fields)
+        info = {'cpu_percent': float(len(taken)), 'memory_percent': 50.0}
+        return info if fields is None else {field: info[field] for field in fields}
+
+    monkeypatch.setattr(collector_module, 'get_system_info', fake_get_system_info)
+    monkeypatch.setattr(collector_module.write_behind, 'record_metrics', lambda snapshot, timestamp: None)
+    return taken
+
+
+@pytest.fixture
+def collector(monkeypatch, samples):
+    collector = MetricsCollector()
+    collector.interval = 60
+    monkeypatch.setattr(collector_module, 'collector', collector)
+    yield collector
+    collector.stop(timeout=1)
+
+
+def test_cpu_sampling_does_not_block_by_default(monkeypatch):
+    intervals = []
+    monkeypatch.setattr(psutil, 'cpu_percent', lambda interval=None: intervals.append(interval) or 5.0)
+    assert get_system_info(fields=['cpu_percent']) == {'cpu_percent': 5.0}
+    assert intervals == [None]
+
+
+def test_thread_refreshes_the_snapshot(collector, samples):
+    collector.interval = 0.01
+    collector.start()
+    deadline = time.monotonic() + 5
+    while len(samples) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(samples) >= 3
+
+    collector.stop(timeout=1)
+    assert not collector.running
+
+    # Readers get the sampler's last snapshot without sampling themselves
+    collector.interval = 60
+    taken = len(samples)
+    assert collector.get_snapshot()[0]['cpu_percent'] == float(taken)
+    assert len(samples) == taken
+
+
+def test_snapshot_age(collector, samples):
+    collector.sample()
+    collector._sampled_at -= 2
+
+    info = get_system_snapshot()
+    assert info['cpu_percent'] == 1.0
+    assert 2 <= info['snapshot_age'] < 3
+    assert datetime.fromisoformat(info['sampled_at']) < datetime.utcnow()
+    assert len(samples) == 1
+
+
+def test_fallback_samples_when_thread_is_not_running(collector, samples):
+    # No snapshot yet: sampled synchronously and kept
+    assert get_system_snapshot()['cpu_percent'] == 1.0
+    assert get_system_snapshot()['cpu_percent'] == 1.0
+    assert samples == [None]
+
+    # Stale: sampled again
+    collector._sampled_at -= collector.interval
+    assert get_system_snapshot()['cpu_percent'] == 2.0
+
+    # Selected fields of a stale snapshot: only those are sampled, and not kept
+    collector._sampled_at -= collector.interval
+    assert get_system_snapshot(['memory_percent'])['memory_percent'] == 50.0
+    assert samples[-1] == ['memory_percent']
+    assert collector._snapshot['cpu_percent'] == 2.0
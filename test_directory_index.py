@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Check the SMB directory size index: bottom-up walks, freshness and the
+background queue
+"""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import create_app, db
+from app.models import DirectorySize
+from app.utils import upserts
+from app.utils.directory_index import UNREADABLE, DirectorySizeIndex, walk_directory_sizes
+
+
+@pytest.fixture(scope='module')
+def app():
+    return create_app('testing')
+
+
+@pytest.fixture
+def index(app, monkeypatch):
+    index = DirectorySizeIndex()
+    index.app = app
+    # Keep queued paths in the queue instead of walking them in a thread
+    monkeypatch.setattr(index, '_start', lambda: None)
+    yield index
+    with app.app_context():
+        DirectorySize.query.delete()
+        db.session.commit()
+
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / 'a' / 'b').mkdir(parents=True)
+    (tmp_path / 'c').mkdir()
+    (tmp_path / 'top.bin').write_bytes(b'x' * 10)
+    (tmp_path / 'a' / 'a.bin').write_bytes(b'x' * 100)
+    (tmp_path / 'a' / 'b' / 'b.bin').write_bytes(b'x' * 1000)
+    return tmp_path
+
+
+def queued(index):
+    return list(index._queue.queue)
+
+
+def test_walk_sums_sizes_bottom_up(tree):
+    sizes = walk_directory_sizes(str(tree))
+    assert {os.path.relpath(path, tree): size for path, (mtime, size) in sizes.items()} == \
+        {'.': 1110, 'a': 1100, os.path.join('a', 'b'): 1000, 'c': 0}
+
+
+def test_unreadable_directory_is_recorded(tree, monkeypatch):
+    locked = str(tree / 'a' / 'b')
+    scandir = os.scandir
+
+    def refuse(path):
+        if os.fspath(path) == locked:
+            raise PermissionError(13, 'Permission denied', locked)
+        return scandir(path)
+
+    monkeypatch.setattr(os, 'scandir', refuse)
+    sizes = walk_directory_sizes(str(tree))
+    assert sizes[locked][1] == UNREADABLE
+    assert sizes[str(tree / 'a')][1] == 100
+    assert sizes[str(tree)][1] == 110
+
+
+def test_missing_directory_is_pending_and_queued(index, tree):
+    path = str(tree / 'a')
+    assert index.lookup({path: os.path.getmtime(path)}) == {path: (None, 'pending')}
+    assert queued(index) == [path]
+
+    # Asking again does not queue it twice
+    index.lookup({path: os.path.getmtime(path)})
+    assert queued(index) == [path]
+
+
+def test_refresh_stores_every_directory_below(index, tree):
+    index.refresh(str(tree))
+    mtimes = {str(path): os.path.getmtime(path) for path in (tree / 'a', tree / 'a' / 'b', tree / 'c')}
+    assert index.lookup(mtimes) == {
+        str(tree / 'a'): (1100, 'fresh'),
+        str(tree / 'a' / 'b'): (1000, 'fresh'),
+        str(tree / 'c'): (0, 'fresh'),
+    }
+    assert queued(index) == []
+
+
+def test_changed_mtime_is_stale(index, tree):
+    path = str(tree / 'a')
+    index.refresh(path)
+    (tree / 'a' / 'new.bin').write_bytes(b'x' * 5)
+    mtime = os.path.getmtime(path) + 1
+    os.utime(path, (mtime, mtime))
+
+    assert index.lookup({path: mtime}) == {path: (1100, 'stale')}
+    assert queued(index) == [path]
+
+    index.refresh(path)
+    assert index.lookup({path: mtime}) == {path: (1105, 'fresh')}
+
+
+def test_old_entry_expires(index, tree):
+    path = str(tree / 'c')
+    index.refresh(path)
+    with index.app.app_context():
+        DirectorySize.query.update({'computed_at': datetime.utcnow() - timedelta(seconds=index.max_age + 1)})
+        db.session.commit()
+
+    assert index.lookup({path: os.path.getmtime(path)}) == {path: (0, 'stale')}
+    assert queued(index) == [path]
+
+
+def test_unreadable_entry_is_not_rewalked(index, tree):
+    path = str(tree / 'c')
+    mtime = os.path.getmtime(path)
+    index.store({path: (mtime, UNREADABLE)})
+
+    assert index.lookup({path: mtime}) == {path: (None, 'unreadable')}
+    assert queued(index) == []
+
+
+@pytest.mark.parametrize('on_conflict', [True, False], ids=['on-conflict', 'savepoint'])
+def test_concurrent_stores_upsert(app, index, tree, monkeypatch, on_conflict):
+    if not on_conflict:
+        # As on a database without INSERT ... ON CONFLICT
+        monkeypatch.setattr(upserts, 'CONFLICT_INSERTS', {})
+    # Another worker walked the same share first
+    other = DirectorySizeIndex()
+    other.app = app
+    path = str(tree / 'a')
+    other.store({path: (1.0, 1)})
+
+    index.refresh(path)
+    with app.app_context():
+        assert DirectorySize.query.filter_by(path=path).one().size == 1100
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Check LTTB downsampling of history columns
+"""
+from app.utils.downsample import downsample_columns, lttb_indices
+
+
+def test_threshold_at_or_above_length_keeps_everything():
+    xs = list(range(10))
+    assert lttb_indices(xs, xs, 10) == list(range(10))
+    assert lttb_indices(xs, xs, 50) == list(range(10))
+
+
+def test_endpoints_are_kept():
+    xs = list(range(1000))
+    ys = [(x * 37) % 101 for x in xs]
+    for threshold in (3, 10, 250):
+        indices = lttb_indices(xs, ys, threshold)
+        assert len(indices) == threshold
+        assert indices[0] == 0 and indices[-1] == 999
+        assert indices == sorted(set(indices))
+
+
+def test_spikes_survive():
+    # Flat line with one spike up and one down: both must be picked
+    xs = list(range(100))
+    ys = [0.0] * 100
+    ys[30] = 100.0
+    ys[70] = -100.0
+    indices = lttb_indices(xs, ys, 10)
+    assert 30 in indices and 70 in indices
+
+
+def test_known_shape():
+    # Square wave with period 20 into 6 points, worked out by hand: buckets of
+    # 24.5 samples, each picking the level change farthest from the line
+    # between the previous pick and the next bucket's average
+    xs = list(range(100))
+    ys = [0.0 if (x // 10) % 2 == 0 else 1.0 for x in xs]
+    assert lttb_indices(xs, ys, 6) == [0, 10, 25, 50, 80, 99]
+
+
+def test_missing_values_count_as_zero():
+    assert lttb_indices([0, 1, 2, 3, 4], [1.0, None, 5.0, None, 1.0], 3) == [0, 2, 4]
+
+
+def test_columns_stay_aligned():
+    columns = {'x': list(range(100)), 'y': [float(x % 7) for x in range(100)], 'label': [f'row {x}' for x in range(100)]}
+    downsampled = downsample_columns(columns, 'x', 'y', 12)
+    assert len({len(values) for values in downsampled.values()}) == 1
+    assert downsampled['label'] == [f'row {x}' for x in downsampled['x']]
+
+    assert downsample_columns(columns, 'x', 'y', 100) is columns
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Check the metrics history export layouts
+"""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import SystemMetrics
+from app.utils.rollups import apply_sample
+
+SAMPLES = 30
+
+
+@pytest.fixture(scope='module')
+def app(app):
+    start = datetime.utcnow().replace(second=0, microsecond=0) - timedelta(minutes=SAMPLES)
+    with app.app_context():
+        for minute in range(SAMPLES):
+            row = {'timestamp': start + timedelta(minutes=minute), 'cpu_percent': float(minute),
+                   'memory_percent': 50.0, 'disk_percent': 10.0,
+                   'network_bytes_sent': minute * 100, 'network_bytes_recv': minute * 200}
+            db.session.add(SystemMetrics(**row))
+            apply_sample(row)
+        db.session.commit()
+    return app
+
+
+def unique_keys(pairs):
+    keys = [key for key, _ in pairs]
+    assert len(keys) == len(set(keys)), f'duplicate keys: {keys}'
+    return dict(pairs)
+
+
+@pytest.mark.parametrize('query', ['hours=3', 'hours=200', 'hours=3&points=10'])
+def test_columnar_export(client, query):
+    response = client.get(f'/api/metrics/history?{query}&format=columnar')
+    body = json.loads(response.get_data(as_text=True), object_pairs_hook=unique_keys)
+
+    assert body['resolution'] == int(response.headers['X-Metrics-Resolution'])
+    columns = {key: value for key, value in body.items() if key != 'resolution'}
+    assert {'t', 'cpu', 'memory', 'disk'} <= set(columns)
+    assert all(isinstance(values, list) for values in columns.values())
+    assert len({len(values) for values in columns.values()}) == 1
+    assert 0 < len(columns['t']) <= SAMPLES
+
+
+@pytest.mark.parametrize('points', [-3, 0, 2])
+def test_too_few_points_are_rejected(client, points):
+    response = client.get(f'/api/metrics/history?hours=3&points={points}')
+    assert response.status_code == 400
+
+
+def test_points_downsample_json(client):
+    rows = client.get('/api/metrics/history?hours=3&points=10').get_json()
+    assert len(rows) == 10
+    everything = client.get('/api/metrics/history?hours=3').get_json()
+    assert rows[0] == everything[0] and rows[-1] == everything[-1]
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Check /api/metrics/stats over seeded raw samples and rollups
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import SystemMetrics
+from app.utils.rollups import apply_sample
+
+NOW = datetime.utcnow().replace(second=0, microsecond=0)
+# Old enough for raw samples to be gone, young enough for the minute tier
+OLD = NOW - timedelta(days=5)
+
+
+def sample(timestamp, cpu):
+    return {'timestamp': timestamp, 'cpu_percent': float(cpu), 'memory_percent': 50.0, 'disk_percent': 10.0,
+            'network_bytes_sent': 0, 'network_bytes_recv': 0}
+
+
+@pytest.fixture(scope='module')
+def app(app):
+    with app.app_context():
+        # Raw: one sample a minute with cpu 1..100
+        for minute in range(100):
+            db.session.add(SystemMetrics(**sample(NOW - timedelta(minutes=100 - minute), minute + 1)))
+
+        # Rollups only: ten minutes with two samples each, cpu 10m and 10m + 10
+        for minute in range(10):
+            apply_sample(sample(OLD + timedelta(minutes=minute), 10 * minute))
+            apply_sample(sample(OLD + timedelta(minutes=minute, seconds=30), 10 * minute + 10))
+        db.session.commit()
+    return app
+
+
+def test_raw_stats(client):
+    stats = client.get('/api/metrics/stats?hours=3').get_json()
+    assert stats['approximate'] is False
+    assert stats['rows'] == 100
+
+    cpu = stats['metrics']['cpu']
+    assert (cpu['min'], cpu['max'], cpu['avg']) == (1.0, 100.0, 50.5)
+    assert (cpu['p50'], cpu['p95'], cpu['p99']) == (50.0, 95.0, 99.0)
+    assert cpu['threshold'] == 90
+    assert cpu['seconds_above'] == 10 * stats['resolution']
+    assert cpu['percent_above'] == 10.0
+
+    memory = stats['metrics']['memory']
+    assert (memory['p50'], memory['seconds_above'], memory['percent_above']) == (50.0, 0, 0.0)
+
+
+def test_threshold_override(client):
+    stats = client.get('/api/metrics/stats?hours=3&cpu_threshold=75&memory_threshold=40').get_json()
+    assert stats['metrics']['cpu']['threshold'] == 75
+    assert stats['metrics']['cpu']['percent_above'] == 25.0
+    assert stats['metrics']['memory']['percent_above'] == 100.0
+    assert stats['metrics']['disk']['threshold'] == 95
+
+
+def test_old_window_is_approximated_from_rollups(client):
+    start = (OLD - timedelta(minutes=1)).isoformat()
+    end = (OLD + timedelta(minutes=30)).isoformat()
+    stats = client.get(f'/api/metrics/stats?start={start}&end={end}').get_json()
+    assert stats['approximate'] is True
+    assert stats['resolution'] == 60
+    assert stats['rows'] == 10
+
+    cpu = stats['metrics']['cpu']
+    # Min, max and avg stay exact
+    assert (cpu['min'], cpu['max'], cpu['avg']) == (0.0, 100.0, 50.0)
+    # Percentiles and time above come from the bucket averages 5, 15, ..., 95
+    assert (cpu['p50'], cpu['p95'], cpu['p99']) == (45.0, 95.0, 95.0)
+    assert cpu['seconds_above'] == 60
+    assert cpu['percent_above'] == 10.0
+
+
+def test_bad_window_is_rejected(client):
+    assert client.get('/api/metrics/stats?start=yesterday').status_code == 400
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Check the dashboard panel deadline: slow panels come back as None, keep
+running and are joined, and the API never waits on them for good
+"""
+import threading
+
+import pytest
+
+from app.api import routes
+from app.utils.panels import PanelCollector, panel_collector
+
+
+@pytest.fixture
+def gate():
+    gate = threading.Event()
+    yield gate
+    gate.set()
+
+
+def test_slow_panel_misses_the_deadline(gate):
+    collector = PanelCollector()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        gate.wait(5)
+        return 'slow'
+
+    results = collector.collect({'fast': (lambda: 'fast',), 'slow': (slow,), 'broken': (lambda: 1 / 0,)},
+                                timeout=0.1)
+    assert results == {'fast': 'fast', 'slow': None, 'broken': None}
+
+    # Asked again while still running: joined, not started twice
+    future = collector.submit(slow)
+    gate.set()
+    assert future.result(timeout=5) == 'slow'
+    assert len(calls) == 1
+    assert collector.collect({'slow': (slow,)}, timeout=5) == {'slow': 'slow'}
+    assert len(calls) == 2
+
+
+def test_smb_files_api_gives_up_on_a_hung_share(client, gate, monkeypatch):
+    def hung(path):
+        gate.wait(5)
+        return []
+
+    monkeypatch.setattr(routes, 'get_smb_files', hung)
+    monkeypatch.setattr(panel_collector, 'api_timeout', 0.1)
+
+    files = client.get('/api/smb_files').get_json()
+    assert [file['type'] for file in files] == ['error']
+
+    gate.set()
+    panel_collector.submit(hung, client.application.config['BASE_SMB_PATH']).result(timeout=5)
+    assert client.get('/api/smb_files').get_json() == []
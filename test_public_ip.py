@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Check the public IP cache: TTL, negative caching after failures and a single
+lookup in flight
+"""
+import threading
+import time
+
+import pytest
+
+from app.utils import public_ip
+from app.utils.public_ip import PENDING_PUBLIC_IP, UNKNOWN_PUBLIC_IP, PublicIPResolver
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+class Fetcher:
+    """Stands in for requests.get: answers with ``self.answer`` or raises it"""
+
+    def __init__(self):
+        self.answer = '203.0.113.7'
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, url, timeout):
+        self.calls += 1
+        self.release.wait(5)
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return self
+
+    def raise_for_status(self):
+        pass
+
+    @property
+    def text(self):
+        return self.answer + '\n'
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(public_ip, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def fetcher(monkeypatch):
+    fetcher = Fetcher()
+    monkeypatch.setattr(public_ip.requests, 'get', fetcher)
+    return fetcher
+
+
+@pytest.fixture
+def resolver(clock, fetcher):
+    resolver = PublicIPResolver()
+    resolver.ttl = 600
+    resolver.failure_ttl = 60
+    return resolver
+
+
+def settle(resolver):
+    deadline = time.monotonic() + 5
+    while resolver._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not resolver._refreshing
+
+
+def test_value_is_cached_for_ttl(resolver, clock, fetcher):
+    fetcher.release.clear()
+    assert resolver.get() == PENDING_PUBLIC_IP
+    fetcher.release.set()
+    settle(resolver)
+    assert resolver.get() == '203.0.113.7'
+    assert fetcher.calls == 1
+
+    clock.now += 599
+    assert resolver.get() == '203.0.113.7'
+    settle(resolver)
+    assert fetcher.calls == 1
+
+    # Expired: the old value is still answered while it is looked up again
+    fetcher.answer = '203.0.113.8'
+    fetcher.release.clear()
+    clock.now += 1
+    assert resolver.get() == '203.0.113.7'
+    fetcher.release.set()
+    settle(resolver)
+    assert fetcher.calls == 2
+    assert resolver.get() == '203.0.113.8'
+
+
+def test_failures_are_cached(resolver, clock, fetcher):
+    fetcher.answer = ConnectionError('offline')
+    resolver.get()
+    settle(resolver)
+    assert resolver.get() == UNKNOWN_PUBLIC_IP
+    assert fetcher.calls == 1
+
+    clock.now += 59
+    assert resolver.get() == UNKNOWN_PUBLIC_IP
+    settle(resolver)
+    assert fetcher.calls == 1
+
+    fetcher.answer = '203.0.113.7'
+    clock.now += 1
+    resolver.get()
+    settle(resolver)
+    assert fetcher.calls == 2
+    assert resolver.get() == '203.0.113.7'
+
+
+def test_known_value_survives_a_failure(resolver, clock, fetcher):
+    resolver.refresh()
+    fetcher.answer = ConnectionError('offline')
+    clock.now += 600
+    assert resolver.get() == '203.0.113.7'
+    settle(resolver)
+    assert resolver.get() == '203.0.113.7'
+    assert fetcher.calls == 2
+
+    # Retried after failure_ttl, not after the full ttl
+    clock.now += 60
+    resolver.get()
+    settle(resolver)
+    assert fetcher.calls == 3
+
+
+def test_one_lookup_in_flight(resolver, fetcher):
+    fetcher.release.clear()
+    threads = [threading.Thread(target=resolver.get) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert resolver.get() == PENDING_PUBLIC_IP
+
+    fetcher.release.set()
+    settle(resolver)
+    assert fetcher.calls == 1
+    assert resolver.get() == '203.0.113.7'
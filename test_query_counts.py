@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Check that list pages load authors and users with the rows, not one query per row
+"""
+import re
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models import AuditLog, ChatMessage, User
+
+USERS = 5
+ROWS_PER_USER = 20
+
+# Statements reading the tables the list pages serialize (metrics snapshots
+# written on the way are not counted)
+LIST_TABLES = re.compile(r'\b(?:FROM|JOIN)\s+"?(?:user|chat_message|audit_log)\b')
+
+# Page or endpoint -> most of those statements it may run, whatever the number of rows
+QUERY_BUDGETS = {
+    '/index': 1,
+    '/chat': 1,
+    '/api/chat_messages': 2,
+    '/api/chat_messages?before_id=60&limit=50': 2,
+    '/api/chat_messages?after_id=10': 2,
+    '/api/user_activity': 3,
+    '/admin/audit_logs': 3,
+}
+
+
+@pytest.fixture(scope='module')
+def app(app):
+    with app.app_context():
+        users = [User(username=f'user{n}', email=f'user{n}@example.com', name=f'User {n}') for n in range(USERS)]
+        for user in users:
+            user.set_password('secret')
+        db.session.add_all(users)
+        db.session.flush()
+        for _ in range(ROWS_PER_USER):
+            for user in users:
+                db.session.add(ChatMessage(content='hello', user_id=user.id))
+                db.session.add(AuditLog(action='VIEW', user_id=user.id))
+        db.session.commit()
+    return app
+
+
+@pytest.fixture(scope='module')
+def client(app, client):
+    # Requests get their own session, so authors are not already in its identity map
+    with app.app_context():
+        yield client
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if LIST_TABLES.search(statement):
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@pytest.mark.parametrize('url', sorted(QUERY_BUDGETS))
+def test_list_query_count(client, url):
+    with count_queries() as statements:
+        response = client.get(url)
+    assert response.status_code == 200, url
+    assert len(statements) <= QUERY_BUDGETS[url], '\n'.join([url] + statements)
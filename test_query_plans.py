@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Check with EXPLAIN QUERY PLAN that the hot route queries use an index
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import create_app, db
+from app.models import AuditLog, ChatMessage, MetricsRollup, ServiceStatus, SystemMetrics, User
+
+SINCE = datetime(2024, 1, 1)
+
+HOT_QUERIES = {
+    'audit log page': lambda: AuditLog.query.order_by(AuditLog.timestamp.desc()).limit(50),
+    'recent chat messages': lambda: ChatMessage.query.order_by(ChatMessage.timestamp.desc()).limit(20),
+    'older chat messages': lambda: ChatMessage.query.filter(ChatMessage.id < 1000)
+        .order_by(ChatMessage.id.desc()).limit(51),
+    'active users': lambda: db.session.query(db.func.count(User.id)).filter(User.last_login >= SINCE),
+    'login lookup': lambda: User.query.filter_by(username='admin'),
+    'service statuses by name': lambda: ServiceStatus.query.filter(ServiceStatus.service_name.in_(['openvpn', 'squid'])),
+    'recent metrics': lambda: SystemMetrics.query.order_by(SystemMetrics.timestamp.desc()).limit(20),
+    'metrics history': lambda: SystemMetrics.query.filter(SystemMetrics.timestamp >= SINCE),
+    'metrics rollups': lambda: MetricsRollup.query.filter(
+        MetricsRollup.resolution == 900, MetricsRollup.bucket_start >= SINCE - timedelta(days=1)),
+}
+
+
+@pytest.fixture(scope='module')
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        yield app
+
+
+def query_plan(query):
+    sql = query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+    with db.engine.connect() as connection:
+        rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}').fetchall()
+    return [row[-1] for row in rows]
+
+
+@pytest.mark.parametrize('name', sorted(HOT_QUERIES))
+def test_hot_query_uses_index(app, name):
+    query = HOT_QUERIES[name]()
+    plan = query_plan(query)
+    assert plan, name
+    for step in plan:
+        assert 'INDEX' in step or 'PRIMARY KEY' in step, f'{name}: {plan}'
+        # A filtered query must seek into an index, not walk all of it
+        if query.whereclause is not None:
+            assert step.startswith('SEARCH'), f'{name} scans the whole table: {plan}'
+    assert not any('TEMP B-TREE' in step for step in plan), f'{name} sorts without an index: {plan}'
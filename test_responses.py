@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Check response compression, JSON ETags, fingerprinted static files and poll hints
+"""
+import gzip
+import re
+
+import pytest
+
+
+def test_page_is_gzipped(client):
+    response = client.get('/metrics', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert b'</html>' in gzip.decompress(response.data)
+
+    assert 'Content-Encoding' not in client.get('/metrics').headers
+
+
+def test_pages_with_csrf_token_are_not_compressed(client, monkeypatch):
+    # The dashboard renders csrf_token() directly
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert b'</html>' in response.data
+
+    # Form pages carry the token through hidden_tag() once CSRF is on
+    monkeypatch.setitem(client.application.config, 'WTF_CSRF_ENABLED', True)
+    response = client.get('/chat', headers={'Accept-Encoding': 'gzip'})
+    assert b'name="csrf_token"' in response.data
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_static_assets_are_fingerprinted(client):
+    html = client.get('/').get_data(as_text=True)
+    url = re.search(r'/static/css/base\.css\?v=\w+', html).group(0)
+
+    response = client.get(url)
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert b'.glass-effect' in response.data
+
+    stale = client.get('/static/css/base.css?v=outdated')
+    assert 'immutable' not in stale.headers.get('Cache-Control', '')
+
+
+def test_static_assets_are_compressed_once(client, monkeypatch):
+    calls = []
+    real_compress = gzip.compress
+    monkeypatch.setattr(gzip, 'compress', lambda *args, **kwargs: calls.append(1) or real_compress(*args, **kwargs))
+
+    responses = [client.get('/static/css/base.css', headers={'Accept-Encoding': 'gzip'}) for _ in range(3)]
+    assert {response.headers['Content-Encoding'] for response in responses} == {'gzip'}
+    assert len({response.data for response in responses}) == 1
+    assert b'.glass-effect' in gzip.decompress(responses[0].data)
+    assert len(calls) <= 1
+
+
+def test_json_etag_revalidates(client):
+    response = client.get('/api/service_status/squid')
+    etag = response.headers['ETag']
+    assert etag.startswith('W/')
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+    revalidated = client.get('/api/service_status/squid', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+
+
+@pytest.mark.parametrize('url', ['/api/system_info', '/api/dashboard_stats'])
+def test_system_snapshot_revalidates(client, url):
+    response = client.get(url)
+    assert float(response.headers['X-Snapshot-Age']) >= 0
+    assert 'X-Snapshot-Sampled-At' in response.headers
+    assert 'snapshot_age' not in response.get_data(as_text=True)
+
+    revalidated = client.get(url, headers={'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
+
+
+def test_streams_are_not_buffered(client):
+    response = client.get('/api/metrics/history?format=ndjson', headers={'Accept-Encoding': 'gzip'})
+    assert response.is_streamed
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_poll_hint_backs_off_when_unchanged(client, monkeypatch):
+    monkeypatch.setattr('os.getloadavg', lambda: (0.0, 0.0, 0.0))
+    response = client.get('/api/service_status/squid')
+    assert response.headers['X-Poll-Interval'] == '5'
+
+    revalidated = client.get('/api/service_status/squid', headers={'If-None-Match': response.headers['ETag']})
+    assert revalidated.headers['X-Poll-Interval'] == '10'
+
+    monkeypatch.setattr('os.getloadavg', lambda: (100.0, 0.0, 0.0))
+    assert client.get('/api/service_status/squid').headers['X-Poll-Interval'] == '20'
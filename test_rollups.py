@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Check the one-off rollup backfill run by the schema migrations and the
+history snapshot behind the columnar export
+"""
+import json
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import create_app, db
+from app.models import MetricsRollup, SystemMetrics
+from app.api.routes import iter_columnar_snapshot
+from app.utils.rollups import (RAW_SOURCE, apply_sample, backfill_rollups, history_query, history_snapshot,
+                               iter_history_column, snapshot_blocks_writers)
+from config import TestingConfig, config
+
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    app.config['METRICS_ROLLUP_TIERS'] = ((60, 7), (3600, 730))
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+def file_app(path, pragmas):
+    # Snapshots only differ from plain reads with a second connection writing
+    class FileTestConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{path}"
+        SQLITE_PRAGMAS = pragmas
+
+    config['rollups-file-test'] = FileTestConfig
+    try:
+        app = create_app('rollups-file-test')
+    finally:
+        del config['rollups-file-test']
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def wal_app(tmp_path):
+    yield from file_app(tmp_path / 'dashboard.db', {'journal_mode': 'WAL'})
+
+
+@pytest.fixture
+def journal_app(tmp_path):
+    yield from file_app(tmp_path / 'dashboard.db', {})
+
+
+def add_samples(minutes):
+    rows = []
+    for minute in minutes:
+        row = {'timestamp': START + timedelta(minutes=minute), 'cpu_percent': float(minute),
+               'memory_percent': 50.0, 'disk_percent': 10.0,
+               'network_bytes_sent': minute * 100, 'network_bytes_recv': minute * 200}
+        db.session.add(SystemMetrics(**row))
+        rows.append(row)
+    db.session.commit()
+    return rows
+
+
+def run_backfill():
+    with db.engine.connect() as connection:
+        created = backfill_rollups(connection, batch_size=7)
+        connection.commit()
+    return created
+
+
+def test_backfill_builds_every_tier(app):
+    add_samples(range(90))
+
+    assert run_backfill() == 90 + 2
+
+    hours = MetricsRollup.query.filter_by(resolution=3600).order_by(MetricsRollup.bucket_start).all()
+    assert [(hour.bucket_start, hour.sample_count) for hour in hours] == [(START, 60), (START + timedelta(hours=1), 30)]
+    assert hours[0].to_dict()['cpu_percent'] == 29.5
+    assert (hours[1].cpu_min, hours[1].cpu_max, hours[1].cpu_last) == (60.0, 89.0, 89.0)
+    assert hours[1].network_bytes_sent == 8900
+
+
+def test_backfill_stops_at_existing_rollups(app):
+    add_samples(range(10))
+    # The collector stored a sample before the migration ran
+    for row in add_samples([10]):
+        apply_sample(row)
+    db.session.commit()
+
+    assert run_backfill() == 10
+    assert MetricsRollup.query.filter_by(resolution=60).count() == 11
+    assert MetricsRollup.query.filter_by(resolution=3600).one().sample_count == 1
+
+
+def test_history_snapshot_keeps_column_passes_aligned(wal_app):
+    add_samples(range(5))
+
+    with history_snapshot() as connection:
+        timestamps = list(iter_history_column(connection, START, RAW_SOURCE, 'timestamp'))
+
+        # A late bucket and an updated row land between the two passes
+        add_samples([5])
+        SystemMetrics.query.filter_by(timestamp=START).update({'cpu_percent': 99.0})
+        db.session.commit()
+
+        cpu = list(iter_history_column(connection, START, RAW_SOURCE, 'cpu_percent'))
+
+    assert len(timestamps) == len(cpu) == 5
+    assert cpu[0] == 0.0
+
+
+@pytest.mark.parametrize('fixture, blocks', [('wal_app', False), ('journal_app', True)])
+def test_columnar_export_does_not_hold_off_writers(request, fixture, blocks):
+    app = request.getfixturevalue(fixture)
+    assert snapshot_blocks_writers() is blocks
+    add_samples(range(5))
+
+    names, _ = history_query(START, RAW_SOURCE)
+    chunks = iter_columnar_snapshot(names, START, RAW_SOURCE, 60)
+    # Up to the end of the first column
+    body = ''
+    while not body.endswith(']'):
+        body += next(chunks)
+
+    # Another worker commits while the client is still reading the export
+    path = app.config['SQLALCHEMY_DATABASE_URI'][len('sqlite:///'):]
+    with sqlite3.connect(path, timeout=0.2) as writer:
+        writer.execute('UPDATE system_metrics SET cpu_percent = 99')
+
+    columns = json.loads(body + ''.join(chunks))
+    assert columns['cpu'] == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert len(columns['t']) == 5
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Check that service status probes from before an invalidation are not cached
+"""
+import threading
+
+from app.utils import service_cache
+from app.utils.service_cache import ServiceStatusCache
+
+
+def test_probe_started_before_invalidate_is_not_cached(monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fake_statuses(names):
+        calls.append(list(names))
+        if len(calls) == 1:
+            started.set()
+            release.wait(5)
+            return {name: {'status': 'inactive'} for name in names}
+        return {name: {'status': 'active'} for name in names}
+
+    monkeypatch.setattr(service_cache, 'get_service_statuses', fake_statuses)
+    cache = ServiceStatusCache()
+
+    results = {}
+    probe = threading.Thread(target=lambda: results.update(cache.get(['squid'])))
+    probe.start()
+    assert started.wait(5)
+
+    # The service is started while the first probe is still running
+    cache.invalidate(['squid'])
+    assert cache.get(['squid'])['squid']['status'] == 'active'
+
+    release.set()
+    probe.join(5)
+    assert results['squid']['status'] == 'inactive'
+
+    assert cache.get(['squid'])['squid']['status'] == 'active'
+    assert len(calls) == 2
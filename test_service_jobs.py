@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Check bulk service jobs: submit, poll from any worker, failure handling and pruning
+"""
+import time
+
+import pytest
+
+from app import create_app
+from app.models import ServiceJob
+from app.utils import service_jobs
+from app.utils.service_jobs import ServiceJobManager, service_job_manager
+from config import TestingConfig, config
+
+
+@pytest.fixture(scope='module')
+def app(tmp_path_factory):
+    # Jobs are written from pool threads: they need a real file, not the
+    # single shared connection of an in-memory database
+    class ServiceJobsTestConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path_factory.mktemp('jobs') / 'dashboard.db'}"
+
+    config['service-jobs-test'] = ServiceJobsTestConfig
+    try:
+        app = create_app('service-jobs-test')
+    finally:
+        del config['service-jobs-test']
+    app.config['WTF_CSRF_ENABLED'] = False
+    return app
+
+
+@pytest.fixture
+def actions(monkeypatch):
+    calls = []
+
+    def fake_control_service(name, action):
+        calls.append((action, name))
+        if name.startswith('broken'):
+            return {'success': False, 'error': f'Failed to {action} {name}'}
+        return {'success': True, 'output': ''}
+
+    monkeypatch.setattr(service_jobs, 'control_service', fake_control_service)
+    return calls
+
+
+def wait_for_job(client, status_url):
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        job = client.get(status_url).get_json()
+        if job['status'] in ('completed', 'failed'):
+            return job
+        time.sleep(0.02)
+    raise AssertionError('Job did not finish')
+
+
+def test_submit_and_poll(client, actions):
+    response = client.post('/api/services/jobs', json={'action': 'restart', 'stages': [['a', 'b'], ['c']]})
+    assert response.status_code == 202
+
+    job = wait_for_job(client, response.get_json()['status_url'])
+    assert job['status'] == 'completed'
+    assert job['stages'] == [['a', 'b'], ['c']]
+    assert job['progress'] == {'done': 3, 'total': 3}
+    assert {name: result['state'] for name, result in job['services'].items()} == \
+        {'a': 'succeeded', 'b': 'succeeded', 'c': 'succeeded'}
+    assert actions[-1] == ('restart', 'c')
+
+
+def test_job_is_visible_to_other_workers(app, client, actions):
+    job_id = client.post('/api/services/jobs', json={'action': 'start', 'services': ['a']}).get_json()['job_id']
+    wait_for_job(client, f'/api/services/jobs/{job_id}')
+
+    # A manager of another process has never seen the job
+    with app.app_context():
+        assert ServiceJobManager(app).get(job_id).status == 'completed'
+
+
+def test_failed_stage_skips_the_rest(client, actions):
+    response = client.post('/api/services/jobs', json={'action': 'start', 'services': ['broken', 'c'],
+                                                       'sequential': True})
+    job = wait_for_job(client, response.get_json()['status_url'])
+
+    assert job['status'] == 'failed'
+    assert job['services']['broken']['state'] == 'failed'
+    assert job['services']['broken']['error'] == 'Failed to start broken'
+    assert job['services']['c']['state'] == 'skipped'
+    assert ('start', 'c') not in actions
+
+
+def test_unknown_job(client):
+    assert client.get('/api/services/jobs/0123456789abcdef').status_code == 404
+
+
+def test_finished_jobs_are_pruned(app, client, actions, monkeypatch):
+    monkeypatch.setattr(service_job_manager, 'max_jobs', 2)
+    job_ids = []
+    for _ in range(4):
+        job_id = client.post('/api/services/jobs', json={'action': 'reload', 'services': ['a']}).get_json()['job_id']
+        wait_for_job(client, f'/api/services/jobs/{job_id}')
+        job_ids.append(job_id)
+
+    with app.app_context():
+        kept = [job_id for job_id in job_ids if ServiceJob.query.get(job_id) is not None]
+    assert kept == job_ids[-2:]
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Check that a worker caps its open event streams and refuses the rest with a 503
+"""
+from app import db
+from app.models import ChatMessage, User
+from app.utils.chat_hub import chat_hub
+
+
+def test_streams_beyond_the_cap_are_refused(client, monkeypatch):
+    monkeypatch.setattr(chat_hub, 'max_subscribers', 2)
+
+    chat = client.get('/api/chat/stream')
+    dashboard = client.get('/api/stream')
+    assert chat.status_code == dashboard.status_code == 200
+
+    for url in ('/api/chat/stream', '/api/stream'):
+        refused = client.get(url)
+        assert refused.status_code == 503
+        assert refused.mimetype == 'application/json'
+
+    # Closing a stream frees its slot
+    chat.close()
+    reopened = client.get('/api/stream')
+    assert reopened.status_code == 200
+
+    dashboard.close()
+    reopened.close()
+    assert not chat_hub._subscribers
+
+
+def streamed_ids(response):
+    body = response.get_data(as_text=True)
+    response.close()
+    return [int(line[len('id: '):]) for line in body.splitlines() if line.startswith('id: ')]
+
+
+def test_stream_resumes_after_last_event_id(client, monkeypatch):
+    # End each stream right after the messages it missed
+    monkeypatch.setattr(chat_hub, 'max_duration', 0)
+    # Like a hub whose subscribers all left: it starts at the newest message
+    monkeypatch.setattr(chat_hub, '_last_id', None)
+    with client.application.app_context():
+        admin_id = User.query.filter_by(username='admin').one().id
+        messages = [ChatMessage(content=f'message {n}', user_id=admin_id) for n in range(5)]
+        db.session.add_all(messages)
+        db.session.commit()
+        ids = [message.id for message in messages]
+
+    # Older than the hub's backlog: loaded from the database
+    response = client.get('/api/chat/stream', headers={'Last-Event-ID': str(ids[1])})
+    assert streamed_ids(response) == ids[2:]
+
+    # A first connection resumes after ?after_id=
+    response = client.get(f'/api/chat/stream?after_id={ids[3]}')
+    assert streamed_ids(response) == ids[4:]
+
+    # Messages the hub has polled since are delivered too
+    with client.application.app_context():
+        message = ChatMessage(content='late', user_id=admin_id)
+        db.session.add(message)
+        db.session.commit()
+        late_id = message.id
+    chat_hub._poll()
+    response = client.get('/api/chat/stream', headers={'Last-Event-ID': str(ids[-1])})
+    assert streamed_ids(response) == [late_id]
+    assert not chat_hub._subscribers
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Check the /proc backend against a fixture tree, the batched systemctl parsing
+and field selection on the system info endpoints
+"""
+import os
+import shutil
+import time
+
+import pytest
+from flask import Flask
+
+from app.utils import system_info
+from app.utils.collector import MetricsCollector
+from app.utils.system_info import ProcfsBackend, get_service_statuses, get_system_info
+
+PROC_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_fixtures', 'proc')
+
+HOT_FIELDS = ['cpu_freq', 'memory_percent', 'memory_total', 'memory_used', 'memory_available',
+              'swap_percent', 'swap_total', 'network_bytes_sent', 'network_bytes_recv',
+              'network_packets_sent', 'network_packets_recv', 'uptime', 'load_average']
+
+
+@pytest.fixture
+def proc_root(tmp_path):
+    root = tmp_path / 'proc'
+    shutil.copytree(PROC_FIXTURE, root)
+    return root
+
+
+@pytest.fixture
+def backend(proc_root):
+    backend = ProcfsBackend(proc_root=str(proc_root), disk_path=str(proc_root))
+    yield backend
+    backend.close()
+
+
+def test_procfs_snapshot(backend):
+    assert get_system_info(cpu_interval=None, backend=backend, fields=HOT_FIELDS) == {
+        'cpu_freq': 2500.0,
+        'memory_percent': 50.0,
+        'memory_total': 7.63,
+        'memory_used': 3.34,
+        'memory_available': 3.81,
+        'swap_percent': 25.0,
+        'swap_total': 1.91,
+        'network_bytes_sent': 4000,
+        'network_bytes_recv': 6000,
+        'network_packets_sent': 40,
+        'network_packets_recv': 60,
+        'uptime': '1 day, 2:03:04',
+        'load_average': '0.50, 0.75, 1.00'
+    }
+
+
+def test_procfs_cpu_percent_between_samples(backend, proc_root):
+    assert backend.cpu(None)['cpu_percent'] == 0
+
+    # 400 jiffies later, 200 of them idle
+    (proc_root / 'stat').write_text('cpu  250 0 100 1000 50 0 0 0 0 0\n')
+    assert backend.cpu(None)['cpu_percent'] == 50.0
+
+
+def test_procfs_cpuinfo_is_parsed_once(backend, proc_root):
+    assert backend.cpu(None)['cpu_freq'] == 2500.0
+
+    (proc_root / 'cpuinfo').unlink()
+    assert backend.cpu(None)['cpu_freq'] == 2500.0
+
+
+def test_procfs_root_config_selects_fixture(proc_root):
+    app = Flask(__name__)
+    app.config.update(SYSTEM_INFO_BACKEND='procfs', PROCFS_ROOT=str(proc_root),
+                      METRICS_COLLECTOR_ENABLED=False)
+    try:
+        MetricsCollector(app)
+        assert system_info.hot_backend.name == 'procfs'
+        assert get_system_info(cpu_interval=None, fields=['load_average']) == {'load_average': '0.50, 0.75, 1.00'}
+    finally:
+        system_info.set_hot_backend('psutil')
+
+
+# Stands in for systemctl: records its argv and prints a `show` block per
+# unit the way systemd does, blank line between units
+FAKE_SYSTEMCTL = """#!/bin/sh
+printf '%s\\n' "$@" > "$0.args"
+first=1
+for arg in "$@"; do
+    case "$arg" in
+        show|-*) continue ;;
+    esac
+    [ $first = 1 ] || echo
+    first=0
+    case "$arg" in
+        squid) echo "Id=squid.service"; echo "LoadState=loaded"; echo "ActiveState=active"
+               echo "SubState=running"; echo "UnitFileState=enabled" ;;
+        openvpn) echo "Id=openvpn.service"; echo "LoadState=loaded"; echo "ActiveState=failed"
+                 echo "SubState=failed"; echo "UnitFileState=enabled" ;;
+        *) echo "Id=$arg.service"; echo "LoadState=not-found"; echo "ActiveState=inactive"
+           echo "SubState=dead"; echo "UnitFileState=" ;;
+    esac
+done
+"""
+
+
+@pytest.fixture
+def systemctl(tmp_path, monkeypatch):
+    """Put a fake systemctl first on PATH; returns its path"""
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    script = bin_dir / 'systemctl'
+    script.write_text(FAKE_SYSTEMCTL)
+    script.chmod(0o755)
+    monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    return script
+
+
+def test_service_statuses_from_one_systemctl_call(systemctl):
+    statuses = get_service_statuses(['squid', 'openvpn', 'missing', '--bad'])
+
+    argv = (systemctl.parent / 'systemctl.args').read_text().splitlines()
+    assert argv == ['show', '--no-pager', '--property=Id,LoadState,ActiveState,SubState,UnitFileState',
+                    'squid', 'openvpn', 'missing']
+    assert list(statuses) == ['squid', 'openvpn', 'missing', '--bad']
+    assert statuses['squid'] == {'status': 'active', 'load_state': 'loaded', 'active_state': 'active',
+                                 'sub_state': 'running', 'unit_file_state': 'enabled'}
+    assert statuses['openvpn']['status'] == 'failed'
+    assert statuses['missing']['status'] == 'not-found'
+    assert statuses['--bad'] == {'status': 'error: invalid service name'}
+
+
+def test_service_statuses_time_out(systemctl, monkeypatch):
+    systemctl.write_text('#!/bin/sh\nexec sleep 5\n')
+    monkeypatch.setattr(system_info, 'SYSTEMCTL_SHOW_TIMEOUT', 0.2)
+
+    started = time.monotonic()
+    assert get_service_statuses(['squid', 'openvpn']) == {'squid': {'status': 'timeout'},
+                                                          'openvpn': {'status': 'timeout'}}
+    assert time.monotonic() - started < 2
+
+
+@pytest.mark.parametrize('query, fields', [
+    ('fields=cpu_percent,uptime', {'cpu_percent', 'uptime'}),
+    ('fields=uptime,%20uptime', {'uptime'}),
+    ('profile=widget', {'cpu_percent', 'memory_percent', 'disk_percent'}),
+    ('profile=widget&fields=hostname', {'cpu_percent', 'memory_percent', 'disk_percent', 'hostname'}),
+])
+def test_system_info_field_selection(client, query, fields):
+    response = client.get(f'/api/system_info?{query}')
+    assert response.status_code == 200
+    assert set(response.get_json()) == fields
+
+
+def test_system_info_returns_every_field_by_default(client):
+    assert set(client.get('/api/system_info').get_json()) == set(system_info.SYSTEM_INFO_FIELDS)
+
+
+@pytest.mark.parametrize('url', ['/api/system_info?fields=cpu_percent,bogus', '/api/system_info?profile=bogus',
+                                 '/api/dashboard_stats?fields=bogus', '/api/dashboard_stats?profile=bogus'])
+def test_unknown_fields_are_rejected(client, url):
+    response = client.get(url)
+    assert response.status_code == 400
+    assert 'bogus' in response.get_json()['error']
+
+
+def test_dashboard_stats_field_selection(client):
+    stats = client.get('/api/dashboard_stats?fields=chat_message_count,cpu_percent').get_json()
+    assert stats == {'chat_message_count': 0, 'system_info': {'cpu_percent': stats['system_info']['cpu_percent']}}
+
+    # Only stats: no system info is sampled
+    assert set(client.get('/api/dashboard_stats?fields=user_count').get_json()) == {'user_count'}
+
+    stats = client.get('/api/dashboard_stats?profile=widget').get_json()
+    assert set(stats) == {'system_info'}
+    assert set(stats['system_info']) == {'cpu_percent', 'memory_percent', 'disk_percent'}
+
+    stats = client.get('/api/dashboard_stats').get_json()
+    assert set(stats) == {'system_info', 'openvpn_status', 'squid_status', 'chat_message_count', 'user_count'}
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Check the write-behind queue: one row per metrics bucket, and rejected rows
+cannot block it
+"""
+from datetime import datetime
+
+import pytest
+
+from app import create_app
+from app.models import ServiceStatus, SystemMetrics
+from app.utils import upserts
+from app.utils.write_behind import WriteBehindWriter
+
+
+@pytest.fixture(scope='module')
+def app():
+    return create_app('testing')
+
+
+def test_poison_row_is_dropped_after_retries(app):
+    writer = WriteBehindWriter()
+    writer.app = app
+    now = datetime.utcnow()
+
+    writer.record_service_status('squid', 'active', now)
+    writer.record_service_status(None, 'active', now)  # violates NOT NULL
+    writer.record_service_status('openvpn', 'failed', now)
+
+    for _ in range(writer.max_retries - 1):
+        assert writer.flush() == 0
+        assert writer.get_stats()['queue_depth'] == 3
+
+    assert writer.flush() == 2
+    stats = writer.get_stats()
+    assert stats['dropped'] == 1
+    assert stats['errors'] == writer.max_retries
+    assert stats['queue_depth'] == 0
+
+    with app.app_context():
+        assert {service.service_name: service.status for service in ServiceStatus.query} == \
+            {'squid': 'active', 'openvpn': 'failed'}
+
+    writer.record_service_status('squid', 'inactive', datetime.utcnow())
+    assert writer.flush() == 1
+
+
+def test_retried_batch_is_coalesced_once(app, monkeypatch):
+    writer = WriteBehindWriter()
+    writer.app = app
+    now = datetime.utcnow()
+    for seconds in range(3):
+        writer.record_service_status('squid', 'active', now.replace(second=seconds))
+
+    def fail(rows):
+        raise RuntimeError('database is locked')
+
+    monkeypatch.setattr(writer, '_write', fail)
+    for _ in range(writer.max_retries - 1):
+        writer.flush()
+    assert writer.get_stats()['coalesced'] == 0
+
+    monkeypatch.undo()
+    assert writer.flush() == 1
+    assert writer.get_stats()['coalesced'] == 2
+
+
+@pytest.mark.parametrize('on_conflict', [True, False], ids=['on-conflict', 'savepoint'])
+def test_one_metrics_row_per_bucket(app, monkeypatch, on_conflict):
+    if not on_conflict:
+        # As on a database without INSERT ... ON CONFLICT
+        monkeypatch.setattr(upserts, 'CONFLICT_INSERTS', {})
+    bucket = datetime(2024, 1, 1, 12, int(on_conflict))
+    sample = {'cpu_percent': 10.0, 'memory_percent': 20.0, 'disk_percent': 30.0}
+
+    # Two workers' collectors offer the same bucket
+    first, second = WriteBehindWriter(), WriteBehindWriter()
+    first.app = second.app = app
+    first.record_metrics(sample, bucket)
+    second.record_metrics(dict(sample, cpu_percent=99.0), bucket)
+
+    assert first.flush() == 1
+    assert second.flush() == 0
+    assert second.get_stats()['errors'] == 0
+    with app.app_context():
+        assert [row.cpu_percent for row in SystemMetrics.query.filter_by(timestamp=bucket)] == [10.0]